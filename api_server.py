@@ -0,0 +1,34 @@
+import argparse
+import asyncio
+import logging
+
+from utils.http_service import AQIService
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve AQI predictions and history as a JSON HTTP API (no Streamlit needed)"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch", type=int, default=1024,
+                        help="Largest number of predictions coalesced into one batch")
+    parser.add_argument("--max-delay-ms", type=float, default=5.0,
+                        help="How long the first request of a batch waits for others to join")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="Threads for prediction batches and history queries")
+    parser.add_argument("--no-store", action="store_true",
+                        help="Do not store served predictions")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    service = AQIService(max_batch=args.max_batch, max_delay=args.max_delay_ms / 1000,
+                         workers=args.workers, store=not args.no_store)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,15 @@
+import time
 import streamlit as st
-import pandas as pd
-from utils.data_generator import get_historical_data, get_cities
-from utils.predictor import AQIPredictor
-from utils.database import get_db
-from components.charts import create_historical_chart, create_gauge_chart
+from utils import metrics
+from utils.assets import image_src, read_text_asset
+from utils.cities_data import get_all_cities, get_cities_in, get_regions, get_states
+from utils.startup import format_profile, import_profile, profile_requested
 from components.inputs import city_input, environmental_inputs
-import base64
 
-# Initialize database session
-db = next(get_db())
+script_started = time.perf_counter()
+# Spans recorded during this rerun, shown in the admin timing panel
+rerun_trace = metrics.start_trace()
+metrics.serve_from_env()
 
 # Page config
 st.set_page_config(
@@ -16,13 +17,9 @@ st.set_page_config(
     page_icon="🌍",
     layout="wide"
 )
-# Function to encode local image
-def get_base64_image(image_path):
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode()
-
-# Convert local image to base64
-image_base64 = get_base64_image("वाU_check_20250224_210949_0000_prev_ui-removebg-preview.png")
+# Header logo, resized to its 160px display height once per process
+with metrics.span('app.assets'):
+    logo_src = image_src("वाU_check_20250224_210949_0000_prev_ui-removebg-preview.png", height=160)
 
 
 # Function to set background image
@@ -46,11 +43,7 @@ set_background()
 # Apply custom CSS to remove top margin from the header
 
 # Load custom CSS
-with open("static/style.css") as f:
-    st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
-
-# Initialize predictor
-predictor = AQIPredictor()
+st.markdown(f"<style>{read_text_asset('static/style.css')}</style>", unsafe_allow_html=True)
 
 st.markdown(
     """
@@ -88,7 +81,7 @@ st.markdown(
 st.markdown(
     f'''
     <div class="title">
-        <img src="data:image/jpg;base64,{image_base64}" alt="Logo" style="height:160px; vertical-align:middle; margin-right:2px;padding-top:10px">
+        <img src="{logo_src}" alt="Logo" style="height:160px; vertical-align:middle; margin-right:2px;padding-top:10px">
         Air Quality Prediction Platform
     </div>
     ''',
@@ -103,19 +96,33 @@ with st.container():
 
     with col1:
        
-        selected_city = city_input(get_cities())
+        selected_city = city_input(get_all_cities())
       
 
     with col2:
       
         temperature, humidity, wind_speed = environmental_inputs()
       
+# Heavy modules (pandas, SQLAlchemy, Plotly) load once the header and inputs are on screen
+from utils.database import pool_stats, session_scope
+from utils.data_generator import get_comparison_data, get_historical_data
+from utils.forecasts import STALE_AFTER, forecast_age, get_forecast
+from utils.predictor import AQIPredictor
+from utils.prediction_writer import get_prediction_writer, prediction_writer_stats
+from components.charts import WIDE_CHART_WIDTH, create_comparison_chart, create_historical_chart, create_gauge_chart
+
+@st.cache_resource
+def get_predictor():
+    """Create the predictor and its background writer on the first prediction"""
+    return AQIPredictor(writer=get_prediction_writer())
+
 # Prediction section
 if st.button("Predict Air Quality"):
+    predictor = get_predictor()
     with st.spinner("Analyzing air quality..."):
         # Get prediction
         predicted_aqi = predictor.predict_aqi(
-            selected_city, temperature, humidity, wind_speed, db
+            selected_city, temperature, humidity, wind_speed
         )
         aqi_level, level_color = predictor.get_aqi_level(predicted_aqi)
 
@@ -172,11 +179,37 @@ if st.button("Predict Air Quality"):
         </div>
         """
     st.markdown(aqi_legend, unsafe_allow_html=True)
+# Precomputed forecast section
+with session_scope() as db:
+    forecast = get_forecast(selected_city, db)
+if not forecast.empty:
+    st.markdown(f'<h3 id="Forecast">{len(forecast)}-Day Forecast</h3>', unsafe_allow_html=True)
+    issued_age = forecast_age(forecast)
+    forecast_hours = issued_age.total_seconds() / 3600
+    if issued_age > STALE_AFTER:
+        st.warning(f"This forecast was issued {forecast_hours / 24:.1f} days ago and may be out of date.")
+    else:
+        st.caption(f"Issued {forecast_hours:.0f} hours ago")
+    forecast_cols = st.columns(len(forecast))
+    for col, day in zip(forecast_cols, forecast.itertuples()):
+        day_level, day_color = AQIPredictor.get_aqi_level(day.aqi)
+        with col:
+            st.markdown(
+                f'<div class="metric-card" style="border-left-color: {day_color}">'
+                f'<p>{day.target_date:%a %d %b}</p>'
+                f'<h3 style="color: {day_color}">{day.aqi:.0f}</h3>'
+                f'<p>{day_level}</p>'
+                '</div>',
+                unsafe_allow_html=True
+            )
 # Historical data section
 st.markdown('<h3 id="HistoricalData">Historical Data</h3>', unsafe_allow_html=True)
-historical_data = get_historical_data(selected_city, db)
+resolution_labels = {"Raw": "raw", "Daily": "day", "Weekly": "week", "Monthly": "month"}
+resolution = st.radio("Resolution", list(resolution_labels), horizontal=True)
+with session_scope() as db:
+    historical_data = get_historical_data(selected_city, db, resolution=resolution_labels[resolution])
 st.plotly_chart(
-    create_historical_chart(historical_data),
+    create_historical_chart(historical_data, width=WIDE_CHART_WIDTH),
     use_container_width=True
 )
 
@@ -245,6 +278,23 @@ with st.expander("Historical Data "):
         {'selector': 'td', 'props': [('padding', '10px'), ('text-align', 'center')]},
          ])
             )
+
+# City comparison section: one grouped query for every selected city
+st.markdown('<h3 id="CompareCities">Compare Cities</h3>', unsafe_allow_html=True)
+compare_by = st.radio("Compare by", ["Cities", "State", "Region"], horizontal=True)
+if compare_by == "Cities":
+    compare_cities = st.multiselect("Cities to compare", get_all_cities(), default=[selected_city])
+elif compare_by == "State":
+    compare_cities = get_cities_in(state=st.selectbox("State", get_states()))
+else:
+    compare_cities = get_cities_in(region=st.selectbox("Region", get_regions()))
+if compare_cities:
+    with session_scope() as db:
+        comparison_data = get_comparison_data(compare_cities, db, resolution=resolution_labels[resolution])
+    st.plotly_chart(
+        create_comparison_chart(comparison_data, width=WIDE_CHART_WIDTH),
+        use_container_width=True
+    )
 import os
 
 # Team member data
@@ -311,16 +361,6 @@ st.markdown(
 # Header
 st.markdown("<h2 style='text-align: center;'>🚀 Meet Our Team</h2>", unsafe_allow_html=True)
 
-# Function to check if an image exists
-def encode_image(image_path):
-    if os.path.exists(image_path):
-        with open(image_path, "rb") as img_file:
-            return base64.b64encode(img_file.read()).decode("utf-8")
-    else:
-        # Fallback image (Ensure "images/default.jpg" exists)
-        with open("images/default.jpg", "rb") as img_file:
-            return base64.b64encode(img_file.read()).decode("utf-8")
-
 # Render Team Cards in Rows of 3
 cols_per_row = 3  # Number of cards per row
 rows = [team_members[i:i + cols_per_row] for i in range(0, len(team_members), cols_per_row)]
@@ -329,15 +369,30 @@ for row in rows:
     cols = st.columns(cols_per_row)
     for col, member in zip(cols, row):
         with col:
-            image_base64 = encode_image(member['image'])
+            # Cropped to the 100px avatar size; falls back to images/default.jpg
+            avatar_src = image_src(member['image'], width=100, height=100, square=True)
             st.markdown(
                 f"""
                 <div class="team-card" style="text-align: center; padding: 10px; border-radius: 10px; background: rgba(255, 255, 255, 0.2);">
-                    <img src="data:image/jpeg;base64,{image_base64}" alt="{member['name']}" style="width: 100px; height: 100px; border-radius: 50%;">
+                    <img src="{avatar_src}" alt="{member['name']}" style="width: 100px; height: 100px; border-radius: 50%;">
                     <h3>{member['name']}</h3>
                     <p><strong>{member['role']}</strong></p>
                     <p>{member['bio']}</p>
                 </div>
                 """,
                 unsafe_allow_html=True
-            )
\ No newline at end of file
+            )
+
+# Import-time breakdown: streamlit run app.py -- --profile-startup
+if profile_requested():
+    with st.expander("Startup profile", expanded=True):
+        st.caption(f"Script run took {time.perf_counter() - script_started:.3f}s")
+        st.code(format_profile(import_profile()))
+
+# Per-rerun timings for admins: AQI_METRICS=1, AQI_ADMIN_TOKEN=<token>, open the app with ?admin=<token>
+metrics.end_trace()
+if metrics.is_enabled() and metrics.admin_allowed(st.query_params.get("admin")):
+    with st.expander("Rerun timings", expanded=True):
+        st.caption(f"Rerun took {(time.perf_counter() - rerun_trace.started) * 1000:.1f} ms")
+        st.dataframe(rerun_trace.summary(), use_container_width=True)
+        st.json({'pool': pool_stats(), 'prediction_writer': prediction_writer_stats()})
@@ -0,0 +1,118 @@
+import json
+import platform
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+# Differences smaller than this are timer or allocator noise, whatever the ratio
+NOISE_FLOOR = {'p50_ms': 0.05, 'p95_ms': 0.1, 'p99_ms': 0.1, 'peak_memory_mb': 0.5}
+
+
+def measure(fn: Callable[[], object], repeat: int = 20, warmup: int = 1,
+            items_per_call: int = 1) -> Dict:
+    """Time ``fn`` and return latency percentiles, throughput and peak memory.
+
+    Latencies come from ``repeat`` untraced calls. Peak memory is taken
+    from one extra call under tracemalloc, which would otherwise distort
+    the timings. ``items_per_call`` scales throughput to rows or
+    predictions per second.
+    """
+    for _ in range(warmup):
+        fn()
+
+    latencies = np.empty(repeat)
+    for i in range(repeat):
+        started = time.perf_counter()
+        fn()
+        latencies[i] = time.perf_counter() - started
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        'repeat': repeat,
+        'p50_ms': p50 * 1000,
+        'p95_ms': p95 * 1000,
+        'p99_ms': p99 * 1000,
+        'mean_ms': latencies.mean() * 1000,
+        'throughput_per_s': repeat * items_per_call / latencies.sum(),
+        'peak_memory_mb': peak / (1024 * 1024),
+    }
+
+
+def environment(database_url: str) -> Dict:
+    """Describe where a benchmark run happened"""
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'database': database_url.split(':', 1)[0],
+    }
+
+
+def save_results(path: str, meta: Dict, results: Dict[str, Dict]) -> None:
+    with open(path, 'w') as handle:
+        json.dump({'meta': meta, 'results': results}, handle, indent=2, sort_keys=True)
+
+
+def load_results(path: str) -> Dict[str, Dict]:
+    with open(path) as handle:
+        return json.load(handle)['results']
+
+
+def compare(baseline: Dict[str, Dict], current: Dict[str, Dict], threshold: float = 0.25,
+            metrics: Optional[List[str]] = None) -> List[Dict]:
+    """Return one row per scenario and metric present in both runs.
+
+    A row is a regression when ``current / baseline`` exceeds
+    ``1 + threshold`` and the absolute change is above ``NOISE_FLOOR``.
+    Median latency and peak memory are compared by default; tail
+    percentiles from a handful of calls are too noisy to gate on.
+    """
+    metrics = metrics or ['p50_ms', 'peak_memory_mb']
+    rows = []
+    for name in sorted(set(baseline) & set(current)):
+        for metric in metrics:
+            before = baseline[name].get(metric)
+            after = current[name].get(metric)
+            if not before or after is None:
+                continue
+            ratio = after / before
+            rows.append({
+                'scenario': name,
+                'metric': metric,
+                'baseline': before,
+                'current': after,
+                'ratio': ratio,
+                'regressed': ratio > 1 + threshold and after - before > NOISE_FLOOR.get(metric, 0),
+            })
+    return rows
+
+
+def format_results(results: Dict[str, Dict]) -> str:
+    lines = [f"{'scenario':<36}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'per s':>12}{'peak MB':>10}"]
+    for name, result in results.items():
+        lines.append(
+            f"{name:<36}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+            f"{result['throughput_per_s']:>12,.0f}{result['peak_memory_mb']:>10.1f}"
+        )
+    return '\n'.join(lines)
+
+
+def format_comparison(rows: List[Dict]) -> str:
+    lines = [f"{'scenario':<36}{'metric':<16}{'baseline':>10}{'current':>10}{'change':>9}"]
+    for row in rows:
+        flag = '  REGRESSED' if row['regressed'] else ''
+        lines.append(
+            f"{row['scenario']:<36}{row['metric']:<16}{row['baseline']:>10.2f}{row['current']:>10.2f}"
+            f"{row['ratio'] - 1:>+9.1%}{flag}"
+        )
+    return '\n'.join(lines)
@@ -0,0 +1,201 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.harness import (
+    compare,
+    environment,
+    format_comparison,
+    format_results,
+    load_results,
+    measure,
+    save_results,
+)
+
+# Synthetic readings are spread over these cities, one hourly row per city in turn
+BENCH_CITIES = [f"Bench City {i}" for i in range(10)]
+GENERATE_CITY = "Bench Generate"
+# Fixed end of the synthetic history so reruns load identical tables
+ANCHOR = datetime(2025, 1, 1)
+LOAD_CHUNK = 500_000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark prediction, history queries, data generation and chart building"
+    )
+    parser.add_argument("--rows", default="1000,10000,100000",
+                        help="Comma separated synthetic table sizes, e.g. 1000,10000,1000000,10000000")
+    parser.add_argument("--database-url",
+                        help="Database to benchmark against (defaults to a SQLite file in the temp "
+                             "directory, reused between runs); use a disposable database")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed calls per scenario")
+    parser.add_argument("--only", help="Only run scenarios whose name contains this text")
+    parser.add_argument("--output", help="Write results as JSON (use as a baseline later)")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed slowdown or memory growth before --compare fails (0.25 = 25%%)")
+    return parser.parse_args()
+
+
+def synthetic_frame(first: int, last: int) -> pd.DataFrame:
+    """Return synthetic readings ``first`` to ``last`` of the benchmark table"""
+    index = np.arange(first, last)
+    rng = np.random.default_rng(first)
+    return pd.DataFrame({
+        'city': np.asarray(BENCH_CITIES, dtype=object)[index % len(BENCH_CITIES)],
+        'date': ANCHOR - pd.to_timedelta(index // len(BENCH_CITIES), unit='h'),
+        'aqi': np.clip(rng.normal(120, 40, len(index)), 0, 500),
+        'temperature': rng.normal(30, 5, len(index)),
+        'humidity': rng.normal(65, 15, len(index)),
+        'wind_speed': rng.normal(12, 4, len(index)),
+        'is_prediction': 0,
+    })
+
+
+def ensure_rows(db, rows: int) -> None:
+    """Grow (or rebuild) the synthetic readings to exactly ``rows`` rows"""
+    from sqlalchemy import delete, func, select
+
+    from utils.data_generator import history_cache
+    from utils.database import AirQualityRecord, copy_records
+    from utils.rollups import update_rollups
+
+    table = AirQualityRecord.__table__
+    bench = table.c.city.in_(BENCH_CITIES)
+    existing = db.execute(
+        select(func.count()).select_from(table).where(bench).where(table.c.is_prediction == 0)
+    ).scalar()
+    if existing == rows:
+        return
+    if existing > rows:
+        db.execute(delete(table).where(bench))
+        db.commit()
+        existing = 0
+
+    started = time.perf_counter()
+    for first in range(existing, rows, LOAD_CHUNK):
+        copy_records(db, synthetic_frame(first, min(rows, first + LOAD_CHUNK)))
+    for city in BENCH_CITIES:
+        update_rollups(db, [city])
+    history_cache.invalidate()
+    print(f"Loaded {rows - existing:,} synthetic rows in {time.perf_counter() - started:.1f}s",
+          file=sys.stderr)
+
+
+def cleanup(db) -> None:
+    """Drop the rows written by the write scenarios"""
+    from sqlalchemy import delete
+
+    from utils.database import AirQualityRecord
+
+    table = AirQualityRecord.__table__
+    db.execute(delete(table).where(table.c.city == GENERATE_CITY))
+    db.execute(delete(table).where(table.c.city.in_(BENCH_CITIES)).where(table.c.is_prediction == 1))
+    db.commit()
+
+
+def fixed_scenarios(db):
+    """Yield (name, callable, items per call) for scenarios that do not depend on table size"""
+    from components.charts import create_gauge_chart
+    from utils.data_generator import generate_and_store_historical_data
+    from utils.predictor import AQIPredictor
+
+    predictor = AQIPredictor()
+    batch = 1000
+    cities = np.asarray(BENCH_CITIES, dtype=object)[np.arange(batch) % len(BENCH_CITIES)]
+    temperatures = np.linspace(15, 40, batch)
+    humidities = np.linspace(30, 90, batch)
+    wind_speeds = np.linspace(2, 25, batch)
+
+    yield "predict.single", lambda: predictor.predict_aqi(BENCH_CITIES[0], 30.0, 60.0, 10.0), 1
+    yield (f"predict.batch_{batch}",
+           lambda: predictor.predict_many(cities, temperatures, humidities, wind_speeds, store=False),
+           batch)
+    yield (f"predict.store_{batch}",
+           lambda: predictor.predict_many(cities, temperatures, humidities, wind_speeds, db=db),
+           batch)
+    yield "generate.store_city", lambda: generate_and_store_historical_data(GENERATE_CITY, db), 30
+    yield "chart.gauge", lambda: create_gauge_chart(142.0), 1
+
+
+def sized_scenarios(db, rows: int):
+    """Yield (name, callable, items per call) for scenarios run against a table of ``rows`` rows"""
+    from components.charts import create_historical_chart
+    from utils.data_generator import get_historical_data
+
+    city = BENCH_CITIES[0]
+    city_rows = rows // len(BENCH_CITIES)
+    week_start = ANCHOR - timedelta(days=7)
+    frame = get_historical_data(city, db, use_cache=False)
+
+    yield (f"history.raw@{rows}",
+           lambda: get_historical_data(city, db, use_cache=False), city_rows)
+    yield (f"history.week_window@{rows}",
+           lambda: get_historical_data(city, db, start=week_start, end=ANCHOR, use_cache=False), 1)
+    yield (f"history.monthly@{rows}",
+           lambda: get_historical_data(city, db, resolution='month', use_cache=False), 1)
+    yield (f"history.cached@{rows}",
+           lambda: get_historical_data(city, db), 1)
+    yield (f"chart.historical@{rows}",
+           lambda: create_historical_chart(frame), len(frame))
+
+
+def main():
+    args = parse_args()
+    sizes = [int(float(size)) for size in args.rows.split(',')]
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.gettempdir(), 'vayucheck-bench.db')}"
+    # utils.database reads DATABASE_URL when it is first imported
+    os.environ['DATABASE_URL'] = database_url
+
+    from utils.database import get_engine, get_session_factory
+    from utils.migrations import create_composite_index, create_tables
+
+    create_tables(get_engine())
+    create_composite_index(get_engine())
+
+    results = {}
+    db = get_session_factory()()
+    try:
+        def run(name, fn, items, repeat):
+            if args.only and args.only not in name:
+                return
+            results[name] = measure(fn, repeat=repeat, items_per_call=items)
+            print(f"{name}: p50 {results[name]['p50_ms']:.2f} ms", file=sys.stderr)
+
+        for name, fn, items in fixed_scenarios(db):
+            run(name, fn, items, args.repeat)
+        for rows in sorted(sizes):
+            ensure_rows(db, rows)
+            # Full-city reads at 10^6+ rows take seconds each
+            repeat = args.repeat if rows < 10 ** 6 else min(args.repeat, 5)
+            for name, fn, items in sized_scenarios(db, rows):
+                run(name, fn, items, repeat)
+        cleanup(db)
+    finally:
+        db.close()
+
+    print(format_results(results))
+    if args.output:
+        save_results(args.output, environment(database_url), results)
+        print(f"Results saved to {args.output}")
+
+    if args.compare:
+        rows = compare(load_results(args.compare), results, threshold=args.threshold)
+        print()
+        print(format_comparison(rows))
+        regressions = [row for row in rows if row['regressed']]
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
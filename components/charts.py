@@ -1,15 +1,52 @@
-import plotly.express as px
-
-def create_historical_chart(data):
-    """Create enhanced historical AQI chart"""
-    fig = px.line(
-        data,
-        x='date',
-        y='aqi',
-        title='Historical AQI Trends'
-    )
+import copy
+from functools import lru_cache
+
+import numpy as np
+import plotly.graph_objects as go
+from utils import metrics
+from utils.downsample import downsample_indices
+
+# Series longer than this are drawn with WebGL instead of SVG
+WEBGL_THRESHOLD = 1000
+# Markers are only drawn while individual points are still distinguishable
+MARKER_LIMIT = 200
+# Widest plot area app.py expects (layout="wide" on a full-HD screen). Charts
+# drawn with use_container_width stretch to the container, so downsample to
+# this many points rather than the 800px default figure width
+WIDE_CHART_WIDTH = 1920
+
+def _from_template(template, patch):
+    """Clone a validated figure dict, apply ``patch`` and wrap it without re-validation"""
+    spec = copy.deepcopy(template)
+    patch(spec)
+    return go.Figure(spec, _validate=False)
+
+def _history_series(data, max_points, method):
+    x = data['date'].to_numpy()
+    y = data['aqi'].to_numpy()
+    if len(y) > max_points:
+        keep = downsample_indices(x, y, max_points, method=method)
+        x, y = x[keep], y[keep]
+    return x, np.asarray(y, dtype=np.float64)
+
+@lru_cache(maxsize=None)
+def _historical_template(webgl):
+    """Build the history chart layout and trace styling once per trace type"""
+    trace_type = go.Scattergl if webgl else go.Scatter
+    fig = go.Figure(trace_type(
+        x=[],
+        y=[],
+        mode='lines+markers',
+        line=dict(color='#4CAF50'),
+        # Markers to highlight data points
+        marker=dict(size=8, color='#4CAF50'),
+        # Add hover effects
+        hovertemplate="Date: %{x}<br>AQI: %{y}<extra></extra>",
+        hoverlabel=dict(bgcolor='rgba(0, 0, 0, 0.8)', font_size=12, font_family="Arial", font_color='white')
+    ))
     
     fig.update_layout(
+        title='Historical AQI Trends',
         plot_bgcolor='rgb(248, 248, 248)',  # Light gray background
         paper_bgcolor='white',
         font_family='Arial, sans-serif',
@@ -34,23 +71,98 @@ def create_historical_chart(data):
         )
     )
     
-    # Markers to highlight data points
-    fig.update_traces(line_color='#4CAF50', mode='lines+markers', marker=dict(size=8, color='#4CAF50'))
-    
-    # Add hover effects
-    fig.update_traces(
-        hovertemplate="Date: %{x}<br>AQI: %{y}<extra></extra>",
-        hoverlabel=dict(bgcolor='rgba(0, 0, 0, 0.8)', font_size=12, font_family="Arial", font_color='white')
+    return fig.to_plotly_json()
+
+@metrics.timed('chart.historical')
+def create_historical_chart(data, width=800, max_points=None, method='lttb'):
+    """Create enhanced historical AQI chart.
+
+    Series longer than ``max_points`` (the chart width in pixels by default)
+    are downsampled server-side, and long series switch to a WebGL trace.
+    The figure is cloned from a prebuilt template and only the data is patched.
+    """
+    if max_points is None:
+        max_points = width
+    x, y = _history_series(data, max_points, method)
+
+    def patch(spec):
+        trace = spec['data'][0]
+        trace['x'] = x
+        trace['y'] = y
+        trace['mode'] = 'lines+markers' if len(y) <= MARKER_LIMIT else 'lines'
+        spec['layout']['width'] = width
+
+    return _from_template(_historical_template(len(data) > WEBGL_THRESHOLD), patch)
+
+# Trace colours for the comparison chart, reused in order when there are more cities
+COMPARISON_COLORS = (
+    '#4CAF50', '#2196F3', '#FF9800', '#9C27B0', '#F44336', '#00BCD4',
+    '#795548', '#E91E63', '#607D8B', '#CDDC39', '#3F51B5', '#FFC107',
+)
+
+@lru_cache(maxsize=None)
+def _comparison_template():
+    """Build the comparison chart layout once"""
+    fig = go.Figure()
+    fig.update_layout(
+        title='AQI Comparison',
+        plot_bgcolor='rgb(248, 248, 248)',
+        paper_bgcolor='white',
+        font_family='Arial, sans-serif',
+        title_font_size=24,
+        title_font_color='rgb(34, 34, 34)',
+        xaxis_title="Date",
+        yaxis_title="AQI",
+        height=500,
+        width=800,
+        hovermode='x unified',
+        legend=dict(orientation='h', yanchor='top', y=-0.2),
+        xaxis=dict(showgrid=True, gridwidth=0.5, gridcolor='rgba(200, 200, 200, 0.5)', ticks='outside'),
+        yaxis=dict(showgrid=True, gridwidth=0.5, gridcolor='rgba(200, 200, 200, 0.5)', ticks='outside'),
     )
-    
-    return fig
-import plotly.graph_objects as go
+    return fig.to_plotly_json()
 
-def create_gauge_chart(aqi_value):
-    """Create AQI gauge chart with enhanced color scheme."""
+@metrics.timed('chart.comparison')
+def create_comparison_chart(data, width=800, max_points=None, method='lttb'):
+    """Create one figure with a trace per city from a wide comparison frame.
+
+    ``data`` is indexed by date with one column per city, as returned by
+    get_comparison_data. Each column is downsampled like the history chart.
+    """
+    if max_points is None:
+        max_points = width
+    dates = data.index.to_numpy()
+    trace_type = 'scattergl' if len(data) > WEBGL_THRESHOLD else 'scatter'
+    traces = []
+    for position, city in enumerate(data.columns):
+        values = data[city].to_numpy()
+        present = ~np.isnan(values)
+        x, y = dates[present], values[present]
+        if len(y) > max_points:
+            keep = downsample_indices(x, y, max_points, method=method)
+            x, y = x[keep], y[keep]
+        traces.append({
+            'type': trace_type,
+            'name': str(city),
+            'x': x,
+            'y': np.asarray(y, dtype=np.float64),
+            'mode': 'lines',
+            'line': {'color': COMPARISON_COLORS[position % len(COMPARISON_COLORS)]},
+            'hovertemplate': "%{fullData.name}: %{y:.1f}<extra></extra>",
+        })
+
+    def patch(spec):
+        spec['data'] = traces
+        spec['layout']['width'] = width
+
+    return _from_template(_comparison_template(), patch)
+
+@lru_cache(maxsize=None)
+def _gauge_template():
+    """Build the gauge layout, axis and colour steps once"""
     fig = go.Figure(go.Indicator(
         mode="gauge+number",
-        value=aqi_value,
+        value=0,
         domain={'x': [0, 1], 'y': [0, 1]},
         gauge={
             'shape': "angular",  # Angular for circular appearance
@@ -71,7 +183,7 @@ def create_gauge_chart(aqi_value):
             'threshold': {
                 'line': {'color': "red", 'width': 4},  # Line to show current AQI value
                 'thickness': 0.75,
-                'value': aqi_value
+                'value': 0
             }
         }
     ))
@@ -84,4 +196,16 @@ def create_gauge_chart(aqi_value):
         margin=dict(l=30, r=30, t=50, b=30)
     )
 
-    return fig
+    return fig.to_plotly_json()
+
+@metrics.timed('chart.gauge')
+def create_gauge_chart(aqi_value):
+    """Create AQI gauge chart with enhanced color scheme."""
+    aqi_value = float(aqi_value)
+
+    def patch(spec):
+        indicator = spec['data'][0]
+        indicator['value'] = aqi_value
+        indicator['gauge']['threshold']['value'] = aqi_value
+
+    return _from_template(_gauge_template(), patch)
@@ -1,45 +1,141 @@
-import os
+import argparse
 import csv
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
+import gzip
+import sys
+import time
+from datetime import datetime
 
-# Load environment variables
-load_dotenv()
+from sqlalchemy import select
 
-# Get database URL from environment
-DATABASE_URL = os.getenv('DATABASE_URL')
+from utils.database import AirQualityRecord, engine
 
-# Fix potential incorrect PostgreSQL URL format
-if DATABASE_URL.startswith('postgres://'):
-    DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
+FORMATS = ("csv", "csv.gz", "parquet")
 
-# Create database engine and session
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-session = SessionLocal()
 
-# Extract data from 'air_quality_records'
-try:
-    result = session.execute(text("SELECT * FROM air_quality_records;"))  # ✅ FIXED
-    records = result.fetchall()
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Stream air_quality_records to CSV, gzip CSV or Parquet"
+    )
+    parser.add_argument("--output", default="air_quality_data.csv", help="Output file path")
+    parser.add_argument("--format", choices=FORMATS,
+                        help="Output format (inferred from the output extension by default)")
+    parser.add_argument("--chunk-size", type=int, default=10000,
+                        help="Rows fetched from the server-side cursor per step")
+    parser.add_argument("--since-id", type=int, help="Only export rows with id greater than this")
+    parser.add_argument("--since-date", type=datetime.fromisoformat,
+                        help="Only export rows dated on or after this ISO date")
+    parser.add_argument("--progress-only", action="store_true",
+                        help="Stream and count matching rows without writing a file")
+    return parser.parse_args()
 
-    # Print extracted data
-    print("Extracted Data:")
-    for row in records:
-        print(row)
 
-    # Save data to CSV
-    csv_filename = "air_quality_data.csv"
-    with open(csv_filename, "w", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerow(result.keys())  # Column headers
-        writer.writerows(records)
+def infer_format(path):
+    if path.endswith(".csv.gz"):
+        return "csv.gz"
+    if path.endswith(".parquet"):
+        return "parquet"
+    return "csv"
 
-    print(f"Data successfully saved to {csv_filename}")
 
-except Exception as e:
-    print("Error extracting data:", e)
+class CsvSink:
+    def __init__(self, path, columns, compress):
+        self.file = gzip.open(path, "wt", newline="") if compress else open(path, "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)  # Column headers
 
-finally:
-    session.close()
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink:
+    def __init__(self, path, columns):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            sys.exit("Parquet export needs pyarrow: pip install pyarrow")
+        self.pa = pa
+        self.columns = columns
+        self.schema = pa.schema([
+            ("id", pa.int64()), ("city", pa.string()), ("date", pa.timestamp("us")),
+            ("aqi", pa.float64()), ("temperature", pa.float64()), ("humidity", pa.float64()),
+            ("wind_speed", pa.float64()), ("is_prediction", pa.int8()),
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def write(self, rows):
+        columns = list(zip(*rows))
+        self.writer.write_table(self.pa.Table.from_arrays(
+            [self.pa.array(values, type=self.schema.field(name).type)
+             for name, values in zip(self.columns, columns)],
+            schema=self.schema
+        ))
+
+    def close(self):
+        self.writer.close()
+
+
+def open_sink(path, fmt, columns):
+    if fmt == "parquet":
+        return ParquetSink(path, columns)
+    return CsvSink(path, columns, compress=fmt == "csv.gz")
+
+
+def main():
+    args = parse_args()
+    fmt = args.format or infer_format(args.output)
+
+    table = AirQualityRecord.__table__
+    stmt = select(table).order_by(table.c.id)
+    if args.since_id is not None:
+        stmt = stmt.where(table.c.id > args.since_id)
+    if args.since_date is not None:
+        stmt = stmt.where(table.c.date >= args.since_date)
+
+    exported = 0
+    last_id = args.since_id
+    started = time.perf_counter()
+    sink = None
+
+    # Extract data from 'air_quality_records' through a server-side cursor
+    try:
+        with engine.connect() as connection:
+            result = connection.execution_options(
+                stream_results=True, max_row_buffer=args.chunk_size
+            ).execute(stmt)
+            columns = list(result.keys())
+            if not args.progress_only:
+                sink = open_sink(args.output, fmt, columns)
+
+            for rows in result.partitions(args.chunk_size):
+                if sink is not None:
+                    sink.write(rows)
+                exported += len(rows)
+                last_id = rows[-1].id
+                elapsed = time.perf_counter() - started
+                print(f"\r{exported:,} rows ({exported / max(elapsed, 1e-9):,.0f} rows/s)",
+                      end="", file=sys.stderr, flush=True)
+
+        print(file=sys.stderr)
+        if sink is not None:
+            sink.close()
+            sink = None
+            print(f"Data successfully saved to {args.output}")
+        print(f"Exported {exported} rows")
+        if last_id is not None:
+            print(f"Last id {last_id}; pass --since-id {last_id} to export the next delta")
+
+    except Exception as e:
+        print("Error extracting data:", e)
+        sys.exit(1)
+
+    finally:
+        if sink is not None:
+            sink.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import argparse
+import time
+
+from utils.database import get_db
+from utils.forecasts import run_forecast_job
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Precompute 1-7 day AQI forecasts for every city (schedule off-peak, e.g. from cron)"
+    )
+    parser.add_argument("--city", action="append", dest="cities",
+                        help="Only forecast this city (repeatable); defaults to all cities")
+    args = parser.parse_args()
+
+    db = next(get_db())
+    try:
+        started = time.perf_counter()
+        stored = run_forecast_job(db, cities=args.cities)
+        elapsed = time.perf_counter() - started
+        print(f"Stored {stored} forecasts in {elapsed:.2f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from utils.synthetic import load_dataset, plan_tasks, task_cities, write_parquet_dataset
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate deterministic hourly AQI readings for load tests, as Parquet or into the database"
+    )
+    parser.add_argument("--start", type=datetime.fromisoformat,
+                        help="First reading (ISO date); defaults to --years before --end")
+    parser.add_argument("--end", type=datetime.fromisoformat,
+                        default=datetime.now().replace(hour=0, minute=0, second=0, microsecond=0),
+                        help="End of the range, exclusive (ISO date); defaults to today")
+    parser.add_argument("--years", type=float, default=1.0, help="Years of history when --start is omitted")
+    parser.add_argument("--seed", type=int, default=0, help="Root seed; the same seed gives identical data")
+    parser.add_argument("--city", action="append", dest="cities",
+                        help="Only generate this city (repeatable); defaults to all cities")
+    parser.add_argument("--replicas", type=int, default=1,
+                        help="Copies of every city ('<city> #2', ...) to scale the row count")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--cities-per-task", type=int, default=50)
+    parser.add_argument("--output", help="Write month-partitioned Parquet here instead of loading the database")
+    parser.add_argument("--skip-rollups", action="store_true",
+                        help="Do not refresh rollups after loading (run 'python migrate.py rollups' later)")
+    args = parser.parse_args()
+
+    start = args.start or (pd.Timestamp(args.end) - pd.DateOffset(days=round(args.years * 365))).to_pydatetime()
+    tasks = plan_tasks(start, args.end, cities=args.cities, root_seed=args.seed,
+                       replicas=args.replicas, cities_per_task=args.cities_per_task)
+    print(f"{len(task_cities(tasks))} cities, {start:%Y-%m-%d} to {args.end:%Y-%m-%d}, {len(tasks)} tasks",
+          file=sys.stderr)
+
+    started = time.perf_counter()
+
+    def progress(done, rows):
+        elapsed = time.perf_counter() - started
+        print(f"\r{done}/{len(tasks)} tasks, {rows:,} rows ({rows / max(elapsed, 1e-9):,.0f} rows/s)",
+              end="", file=sys.stderr, flush=True)
+
+    if args.output:
+        rows = write_parquet_dataset(args.output, tasks, start, args.end, workers=args.workers,
+                                     progress=progress)
+        destination = args.output
+    else:
+        from utils.database import get_db
+
+        db = next(get_db())
+        try:
+            rows = load_dataset(db, tasks, start, args.end, workers=args.workers,
+                                refresh_rollups=not args.skip_rollups, progress=progress)
+        finally:
+            db.close()
+        destination = "the database"
+
+    print(file=sys.stderr)
+    print(f"Wrote {rows:,} rows to {destination} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import argparse
+import logging
+import time
+
+from utils.bulk_import import import_records
+from utils.database import get_db
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load an air_quality_records dump (CSV, .csv.gz or Parquet) into the database"
+    )
+    parser.add_argument("path", nargs="?", default="air_quality_data.csv", help="Dump to import")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="Rows loaded per transaction")
+    parser.add_argument("--restart", action="store_true",
+                        help="Ignore any saved checkpoint and start from the first chunk")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    db = next(get_db())
+    try:
+        started = time.perf_counter()
+        inserted = import_records(db, args.path, chunk_size=args.chunk_size, resume=not args.restart)
+        elapsed = time.perf_counter() - started
+        print(f"Imported {inserted} new rows from {args.path} in {elapsed:.2f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
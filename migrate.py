@@ -0,0 +1,55 @@
+import argparse
+
+from utils.database import get_engine, get_session_factory
+from utils.migrations import (
+    create_composite_index,
+    create_tables,
+    ensure_monthly_partitions,
+    partition_by_month,
+)
+from utils.rollups import update_rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upgrade the air_quality_records schema")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("upgrade", help="Create missing tables and the composite history index")
+
+    subparsers.add_parser("rollups", help="Rebuild daily/weekly/monthly AQI rollups from raw readings")
+
+    partition = subparsers.add_parser(
+        "partition", help="Convert air_quality_records to monthly range partitions (PostgreSQL)"
+    )
+    partition.add_argument("--months-ahead", type=int, default=3,
+                           help="Future months to pre-create partitions for")
+
+    add_partitions = subparsers.add_parser(
+        "add-partitions", help="Pre-create upcoming monthly partitions (run from cron)"
+    )
+    add_partitions.add_argument("--months-ahead", type=int, default=3)
+
+    args = parser.parse_args()
+    engine = get_engine()
+
+    if args.command == "upgrade":
+        create_tables(engine)
+        create_composite_index(engine)
+        print("Schema is up to date")
+    elif args.command == "rollups":
+        db = get_session_factory()()
+        try:
+            written = update_rollups(db)
+        finally:
+            db.close()
+        print(f"Wrote {written} rollup rows")
+    elif args.command == "partition":
+        created = partition_by_month(engine, months_ahead=args.months_ahead)
+        print(f"air_quality_records is partitioned by month ({len(created)} partitions ensured)")
+    elif args.command == "add-partitions":
+        created = ensure_monthly_partitions(engine, months_ahead=args.months_ahead)
+        print(f"Ensured {len(created)} monthly partitions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import argparse
+import time
+
+from utils.database import get_db
+from utils.retention import (ARCHIVE_DIR, DELETE_BATCH_SIZE, PREDICTION_TTL_DAYS, RAW_RETENTION_DAYS,
+                             run_retention)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Archive and delete expired predictions and compact old raw readings into rollups "
+                    "(schedule off-peak, e.g. daily from cron)"
+    )
+    parser.add_argument("--prediction-ttl-days", type=int, default=PREDICTION_TTL_DAYS,
+                        help="Keep prediction rows this many days (PREDICTION_TTL_DAYS)")
+    parser.add_argument("--raw-retention-days", type=int, default=RAW_RETENTION_DAYS,
+                        help="Keep raw readings at least this many days; older whole months survive "
+                             "only as rollups (RAW_RETENTION_DAYS)")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR,
+                        help="Where expired rows are archived as Parquet (RETENTION_ARCHIVE_DIR)")
+    parser.add_argument("--no-archive", action="store_true", help="Delete without archiving")
+    parser.add_argument("--batch-size", type=int, default=DELETE_BATCH_SIZE,
+                        help="Rows deleted per transaction (RETENTION_BATCH_SIZE)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be removed")
+    args = parser.parse_args()
+
+    db = next(get_db())
+    try:
+        started = time.perf_counter()
+        report = run_retention(db, prediction_ttl_days=args.prediction_ttl_days,
+                               raw_retention_days=args.raw_retention_days,
+                               archive_dir=None if args.no_archive else args.archive_dir,
+                               batch_size=args.batch_size, dry_run=args.dry_run)
+        elapsed = time.perf_counter() - started
+    finally:
+        db.close()
+
+    verb = "Would delete" if report.dry_run else "Deleted"
+    print(f"{verb} {report.predictions_deleted:,} predictions before {report.prediction_cutoff:%Y-%m-%d %H:%M} "
+          f"and {report.raw_deleted:,} raw readings before {report.raw_cutoff:%Y-%m-%d}")
+    if report.partitions_dropped:
+        print(f"{'Would drop' if report.dry_run else 'Dropped'} partitions: {', '.join(report.partitions_dropped)}")
+    if not report.dry_run:
+        destination = f" to {len(report.archive_files)} files under {args.archive_dir}" if report.archive_files else ""
+        print(f"Archived {report.archived_rows:,} rows{destination} in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
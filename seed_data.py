@@ -0,0 +1,29 @@
+import argparse
+import time
+
+from utils.data_generator import warm_historical_data
+from utils.database import get_db
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pre-populate historical AQI data for every city before serving traffic"
+    )
+    parser.add_argument("--days", type=int, default=30, help="Days of history to generate per city")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible data")
+    parser.add_argument("--city", action="append", dest="cities",
+                        help="Only seed this city (repeatable); defaults to all cities")
+    args = parser.parse_args()
+
+    db = next(get_db())
+    try:
+        started = time.perf_counter()
+        seeded = warm_historical_data(db, cities=args.cities, days=args.days, seed=args.seed)
+        elapsed = time.perf_counter() - started
+        print(f"Seeded {len(seeded)} cities ({len(seeded) * args.days} rows) in {elapsed:.2f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
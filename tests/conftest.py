@@ -0,0 +1,74 @@
+import os
+import tempfile
+
+# Point the app at a throwaway SQLite database before utils.database is imported
+_tmp_dir = tempfile.mkdtemp(prefix='aqi-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp_dir, 'test.db')}"
+os.environ['AQI_MODEL_DIR'] = os.path.join(_tmp_dir, 'models')
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sqlalchemy import create_engine
+
+from utils.data_generator import history_cache
+from utils.database import Base, copy_records, get_engine, get_session_factory
+
+# A scratch PostgreSQL database for the PostgreSQL-only tests; its tables are dropped and recreated
+POSTGRES_URL = os.getenv('AQI_TEST_POSTGRES_URL')
+
+
+def readings_frame(city: str, start: datetime, periods: int, freq: str = 'h',
+                   is_prediction: int = 0, seed: int = 0) -> pd.DataFrame:
+    """Return ``periods`` synthetic readings for a city starting at ``start``"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'city': city,
+        'date': pd.date_range(start, periods=periods, freq=freq),
+        'aqi': rng.uniform(20, 300, periods),
+        'temperature': rng.uniform(10, 40, periods),
+        'humidity': rng.uniform(20, 90, periods),
+        'wind_speed': rng.uniform(0, 20, periods),
+        'is_prediction': is_prediction,
+    })
+
+
+@pytest.fixture
+def db():
+    """A session on an empty schema, dropped again after the test"""
+    engine = get_engine()
+    Base.metadata.create_all(bind=engine)
+    session = get_session_factory()()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+        history_cache.invalidate()
+
+
+@pytest.fixture
+def insert_readings(db):
+    def insert(*args, **kwargs) -> pd.DataFrame:
+        frame = readings_frame(*args, **kwargs)
+        copy_records(db, frame)
+        return frame
+    return insert
+
+
+@pytest.fixture
+def postgres_engine():
+    """An engine on an empty schema in the AQI_TEST_POSTGRES_URL database"""
+    if not POSTGRES_URL:
+        pytest.skip("set AQI_TEST_POSTGRES_URL to a scratch PostgreSQL database")
+    engine = create_engine(POSTGRES_URL)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    try:
+        yield engine
+    finally:
+        Base.metadata.drop_all(bind=engine)
+        engine.dispose()
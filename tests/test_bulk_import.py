@@ -0,0 +1,62 @@
+from datetime import datetime
+from unittest import mock
+
+import pandas as pd
+import pytest
+from sqlalchemy import func, select
+
+from utils import bulk_import
+from utils.bulk_import import import_records
+from utils.database import AirQualityRecord
+
+from conftest import readings_frame
+
+
+def _count(db):
+    return db.execute(select(func.count()).select_from(AirQualityRecord)).scalar()
+
+
+@pytest.fixture
+def dump(tmp_path):
+    # Ten rows per city, so each 10-row chunk holds one city
+    frame = pd.concat([readings_frame(city, datetime(2025, 1, 1 + offset), 10, seed=offset)
+                       for offset, city in enumerate(['Delhi', 'Pune', 'Agra', 'Kota'])])
+    path = tmp_path / 'dump.csv'
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+def test_rerun_inserts_nothing(db, dump):
+    assert import_records(db, dump, chunk_size=10) == 40
+    assert import_records(db, dump, chunk_size=10) == 0
+    assert _count(db) == 40
+
+
+def test_resume_refreshes_history_of_chunks_from_the_interrupted_run(db, dump):
+    merge_chunk = bulk_import.merge_chunk
+    calls = []
+
+    def interrupt_third_chunk(db, chunk):
+        calls.append(chunk)
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        return merge_chunk(db, chunk)
+
+    with mock.patch.object(bulk_import, 'merge_chunk', interrupt_third_chunk):
+        with pytest.raises(KeyboardInterrupt):
+            import_records(db, dump, chunk_size=10)
+    assert _count(db) == 20
+
+    with mock.patch.object(bulk_import, 'notify_history_written') as notify:
+        assert import_records(db, dump, chunk_size=10) == 20
+    notify.assert_called_once_with(db, ['Agra', 'Delhi', 'Kota', 'Pune'], since=datetime(2025, 1, 1))
+    assert _count(db) == 40
+
+
+def test_empty_source_imports_nothing(db, tmp_path):
+    pytest.importorskip('pyarrow')
+    path = tmp_path / 'none.parquet'
+    readings_frame('Delhi', datetime(2025, 1, 1), 0).to_parquet(path)
+
+    assert import_records(db, str(path)) == 0
+    assert not (tmp_path / 'none.parquet.import-state.json').exists()
@@ -0,0 +1,15 @@
+from collections import Counter
+
+from utils.cities_data import CITY_REGISTRY, get_all_cities, get_cities_in, get_region_and_state
+
+
+def test_every_city_name_is_unique():
+    # History, forecasts and predictions are keyed by name alone
+    assert [name for name, count in Counter(get_all_cities()).items() if count > 1] == []
+    assert len(set(CITY_REGISTRY.names)) == len(CITY_REGISTRY.names)
+
+
+def test_both_udaipurs_resolve_to_their_own_state():
+    assert get_region_and_state('Udaipur') == ('North', 'Rajasthan')
+    assert get_region_and_state('Udaipur (Tripura)') == ('Northeast', 'Tripura')
+    assert 'Udaipur (Tripura)' in get_cities_in('Northeast', 'Tripura')
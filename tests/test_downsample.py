@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from components.charts import create_historical_chart
+from utils.downsample import downsample_indices, lttb_indices, minmax_indices
+
+
+def _reference_lttb(x, y, n_out):
+    """Straightforward per-bucket LTTB, as in Steinarsson's thesis"""
+    n = len(y)
+    bounds = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    kept = [0]
+    for bucket in range(n_out - 2):
+        start, end = bounds[bucket], bounds[bucket + 1]
+        if bucket + 2 < len(bounds):
+            next_start, next_end = bounds[bucket + 1], bounds[bucket + 2]
+            next_x, next_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        a = kept[-1]
+        areas = [abs((x[a] - next_x) * (y[i] - y[a]) - (x[a] - x[i]) * (next_y - y[a]))
+                 for i in range(start, end)]
+        kept.append(start + int(np.argmax(areas)))
+    return np.array(kept + [n - 1])
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(7)
+    x = pd.date_range('2025-01-01', periods=5000, freq='h').to_numpy()
+    y = np.cumsum(rng.normal(0, 5, len(x))) + 150
+    return x, y
+
+
+def test_lttb_matches_the_reference_implementation(series):
+    x, y = series
+    kept = lttb_indices(x, y, 300)
+    assert len(kept) == 300
+    assert kept[0] == 0 and kept[-1] == len(y) - 1
+    np.testing.assert_array_equal(kept, _reference_lttb(x.astype('datetime64[ns]').astype(np.int64).astype(float), y, 300))
+
+
+def test_minmax_keeps_every_bucket_extreme(series):
+    x, y = series
+    kept = minmax_indices(y, 200)
+    assert len(kept) <= 200
+    assert np.all(np.diff(kept) > 0)
+    assert {0, len(y) - 1, int(np.argmin(y)), int(np.argmax(y))} <= set(kept.tolist())
+    bounds = np.linspace(0, len(y), 100).astype(np.int64)
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        assert y[start:end].min() in y[kept] and y[start:end].max() in y[kept]
+
+
+@pytest.mark.parametrize('method', ['lttb', 'minmax'])
+def test_short_series_are_kept_whole(method):
+    y = np.arange(10.0)
+    np.testing.assert_array_equal(downsample_indices(np.arange(10), y, 10, method=method), np.arange(10))
+    np.testing.assert_array_equal(downsample_indices(np.arange(10), y, 50, method=method), np.arange(10))
+
+
+def test_unknown_method_is_rejected(series):
+    with pytest.raises(ValueError):
+        downsample_indices(*series, 100, method='average')
+
+
+def test_history_chart_draws_at_most_one_point_per_pixel(series):
+    x, y = series
+    fig = create_historical_chart(pd.DataFrame({'date': x, 'aqi': y}), width=640)
+    trace = fig.data[0]
+    assert len(trace.y) == 640
+    assert trace.type == 'scattergl'
+    assert fig.layout.width == 640
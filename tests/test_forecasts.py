@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from utils.database import copy_records
+from utils.forecasts import (DEFAULT_WEATHER, FORECAST_HORIZONS, compute_forecasts, forecast_age,
+                             get_forecast, run_forecast_job, store_forecasts)
+from utils.predictor import AQIPredictor
+
+NOW = datetime(2025, 3, 10, 18)
+
+
+class FormulaPredictor(AQIPredictor):
+    def serving_model(self):
+        return None
+
+
+def _readings(city, start, periods, temperature):
+    return pd.DataFrame({
+        'city': city,
+        'date': pd.date_range(start, periods=periods, freq='h'),
+        'aqi': 100.0,
+        'temperature': temperature,
+        'humidity': 50.0,
+        'wind_speed': 5.0,
+        'is_prediction': 0,
+    })
+
+
+def test_horizons_move_from_current_towards_recent_weather(db):
+    # A week at 20C, then a hot last day at 40C
+    copy_records(db, _readings('Delhi', NOW - timedelta(days=7), 6 * 24, 20.0))
+    copy_records(db, _readings('Delhi', NOW - timedelta(hours=23), 23, 40.0))
+
+    frame = compute_forecasts(db, ['Delhi', 'Pune'], predictor=FormulaPredictor(), now=NOW)
+
+    delhi = frame[frame['city'] == 'Delhi']
+    assert list(delhi['horizon_days']) == list(FORECAST_HORIZONS)
+    assert list(delhi['target_date']) == [datetime(2025, 3, 10) + timedelta(days=h) for h in FORECAST_HORIZONS]
+    temperatures = delhi['temperature'].to_numpy()
+    window_mean = (6 * 24 * 20.0 + 23 * 40.0) / (6 * 24 + 23)
+    assert np.all(np.diff(temperatures) < 0)
+    assert 40.0 > temperatures[0] and temperatures[-1] > window_mean
+    # No readings: every day uses the defaults
+    pune = frame[frame['city'] == 'Pune']
+    assert (pune['temperature'] == DEFAULT_WEATHER['temperature']).all()
+
+
+def test_get_forecast_drops_past_days_and_reports_age(db):
+    store_forecasts(db, compute_forecasts(db, ['Delhi'], predictor=FormulaPredictor(), now=NOW))
+
+    later = NOW + timedelta(days=3)
+    forecast = get_forecast('Delhi', db, now=later)
+    assert forecast['target_date'].min() == datetime(2025, 3, 13)
+    assert len(forecast) == len(FORECAST_HORIZONS) - 2
+    assert forecast_age(forecast, now=later) == timedelta(days=3)
+    assert forecast_age(get_forecast('Pune', db, now=later)) is None
+
+
+def test_rerunning_the_job_replaces_the_issuance(db):
+    run_forecast_job(db, ['Delhi'])
+    run_forecast_job(db, ['Delhi'])
+    assert len(get_forecast('Delhi', db)) == len(FORECAST_HORIZONS)
@@ -0,0 +1,67 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select
+
+from utils.database import AirQualityRecord, AQIRollup
+from utils.http_service import AQIService
+
+
+@pytest.fixture
+def service():
+    service = AQIService(store=False, workers=2)
+    yield service
+    service.executor.shutdown(wait=True)
+
+
+def _request(service, method, target, body=b''):
+    status, payload, _ = asyncio.run(service.dispatch(method, target, body))
+    return status, json.loads(payload)
+
+
+def test_history_returns_stored_readings(db, service, insert_readings):
+    insert_readings('Delhi', datetime(2025, 1, 1), 48)
+
+    status, rows = _request(service, 'GET', '/history?city=Delhi&limit=5')
+    assert status == 200
+    assert len(rows) == 5
+
+
+@pytest.mark.parametrize('query, message', [
+    ('city=Atlantis', "unknown city 'Atlantis'"),
+    ('city=Delhi&limit=0', "'limit' must be greater than 0"),
+    ('city=Delhi&limit=-3', "'limit' must be greater than 0"),
+    ('city=Delhi&limit=ten', "'limit' must be an integer"),
+    ('city=Delhi&resolution=year', "'resolution' must be one of raw, day, week, month"),
+])
+def test_history_rejects_bad_queries(db, service, query, message):
+    assert _request(service, 'GET', f'/history?{query}') == (400, {'error': message})
+
+
+def test_history_of_a_city_with_no_readings_writes_nothing(db, service):
+    for resolution in ('raw', 'month'):
+        assert _request(service, 'GET', f'/history?city=Delhi&resolution={resolution}') == (200, [])
+
+    assert db.execute(select(func.count()).select_from(AirQualityRecord)).scalar() == 0
+    assert db.execute(select(func.count()).select_from(AQIRollup)).scalar() == 0
+
+
+def test_predict_rejects_unknown_cities(db, service):
+    body = json.dumps([
+        {'city': 'Delhi', 'temperature': 25, 'humidity': 60, 'wind_speed': 5},
+        {'city': 'Atlantis', 'temperature': 25, 'humidity': 60, 'wind_speed': 5},
+    ]).encode()
+    assert _request(service, 'POST', '/predict', body) == (400, {'error': "unknown city 'Atlantis'"})
+
+
+def test_predict_returns_one_result_per_item(db, service):
+    body = json.dumps([
+        {'city': 'Delhi', 'temperature': 25, 'humidity': 60, 'wind_speed': 5},
+        {'city': 'Pune', 'temperature': 30, 'humidity': 40, 'wind_speed': 2},
+    ]).encode()
+    status, results = _request(service, 'POST', '/predict', body)
+    assert status == 200
+    assert [result['city'] for result in results] == ['Delhi', 'Pune']
+    assert all(result['aqi'] > 0 for result in results)
@@ -0,0 +1,83 @@
+import logging
+import socket
+import urllib.request
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from utils import metrics
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(metrics, 'registry', metrics.MetricsRegistry())
+    monkeypatch.setattr(metrics, '_enabled', True)
+    return metrics.registry
+
+
+@pytest.fixture
+def fresh_server(monkeypatch):
+    monkeypatch.setattr(metrics, '_server', None)
+    monkeypatch.setattr(metrics, '_server_error', None)
+
+
+def test_spans_and_counters_are_rendered(enabled):
+    @metrics.timed('chart.test')
+    def draw():
+        return 'drawn'
+
+    trace = metrics.start_trace()
+    try:
+        assert draw() == 'drawn'
+        metrics.increment('widgets', 3, kind='a')
+    finally:
+        metrics.end_trace()
+
+    rendered = enabled.render()
+    assert 'aqi_chart_seconds_count{span="chart.test"} 1' in rendered
+    assert 'aqi_widgets_total{kind="a"} 3' in rendered
+    assert [row['span'] for row in trace.summary()] == ['chart.test']
+
+
+def test_nothing_is_recorded_when_disabled(monkeypatch):
+    monkeypatch.setattr(metrics, 'registry', metrics.MetricsRegistry())
+    monkeypatch.setattr(metrics, '_enabled', False)
+    with metrics.span('chart.test'):
+        metrics.increment('widgets')
+    assert metrics.registry.render() == '\n'
+
+
+def test_failed_statements_are_not_timed(enabled):
+    engine = create_engine('sqlite://')
+    metrics.instrument_engine(engine)
+    with engine.connect() as conn:
+        conn.execute(text('SELECT 1'))
+        with pytest.raises(Exception):
+            conn.execute(text('SELECT * FROM missing'))
+        conn.execute(text('SELECT 2'))
+    assert 'aqi_sql_seconds_count{span="sql.select"} 2' in enabled.render()
+
+
+def test_metrics_endpoint_serves_the_registry(enabled, fresh_server):
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    metrics.increment('widgets')
+
+    assert metrics.start_http_server(port, host='127.0.0.1')
+    with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics', timeout=5) as response:
+        assert 'aqi_widgets_total 1' in response.read().decode()
+    assert metrics.start_http_server(port, host='127.0.0.1')
+
+
+def test_port_in_use_is_logged_once_and_not_retried(fresh_server, caplog):
+    with socket.socket() as taken:
+        taken.bind(('127.0.0.1', 0))
+        taken.listen()
+        port = taken.getsockname()[1]
+        with caplog.at_level(logging.ERROR, logger=metrics.__name__):
+            assert not metrics.start_http_server(port, host='127.0.0.1')
+            assert not metrics.start_http_server(port, host='127.0.0.1')
+    assert len(caplog.records) == 1
+    # The failure is remembered even once the port is free again
+    assert not metrics.start_http_server(port, host='127.0.0.1')
@@ -0,0 +1,40 @@
+from datetime import date, datetime
+
+from sqlalchemy import text
+
+from utils import migrations
+from utils.migrations import DEFAULT_PARTITION, TABLE, ensure_monthly_partitions, partition_by_month
+
+
+def _insert(conn, when: datetime, count: int) -> None:
+    conn.execute(text(
+        f"INSERT INTO {TABLE} (city, date, aqi, temperature, humidity, wind_speed, is_prediction) "
+        "SELECT 'Delhi', :when, 100, 25, 50, 5, 0 FROM generate_series(1, :count)"
+    ), {'when': when, 'count': count})
+
+
+def _count(conn, table: str) -> int:
+    return conn.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+
+
+def test_new_partition_takes_over_rows_from_the_default_partition(postgres_engine):
+    partition_by_month(postgres_engine, months_ahead=0)
+    # Ahead of every partition, so they land in the default partition
+    later = migrations._add_months(migrations._month_start(date.today()), 2)
+    with postgres_engine.begin() as conn:
+        _insert(conn, datetime(later.year, later.month, 10), 5)
+        _insert(conn, datetime(2999, 1, 1), 2)
+
+    created = ensure_monthly_partitions(postgres_engine, months_ahead=3)
+
+    name = migrations._partition_name(later)
+    assert name in created
+    with postgres_engine.connect() as conn:
+        assert _count(conn, name) == 5
+        assert _count(conn, DEFAULT_PARTITION) == 2
+        assert _count(conn, TABLE) == 7
+        indexes = conn.execute(text("SELECT indexdef FROM pg_indexes WHERE tablename = :name"),
+                               {'name': name}).scalars().all()
+    assert any('(city, is_prediction, date)' in index for index in indexes)
+    # Reruns are no-ops
+    assert ensure_monthly_partitions(postgres_engine, months_ahead=3) == created
@@ -0,0 +1,54 @@
+import os
+import shutil
+from unittest import mock
+
+import joblib
+import numpy as np
+import pytest
+
+from utils.model_store import BUNDLED_MODEL_PATH, ModelStore
+from utils.predictor import AQIPredictor
+
+BUNDLED_SIDECAR = ModelStore.metadata_path(BUNDLED_MODEL_PATH)
+
+
+@pytest.fixture
+def bundled_copy(tmp_path):
+    """Copy the bundled model (without its sidecar) into a scratch directory"""
+    path = str(tmp_path / 'aqi_model.pkl')
+    shutil.copy(BUNDLED_MODEL_PATH, path)
+    return path
+
+
+def test_bundled_model_is_served_in_its_recorded_layout(bundled_copy, tmp_path):
+    shutil.copy(BUNDLED_SIDECAR, ModelStore.metadata_path(bundled_copy))
+    store = ModelStore(model_dir=str(tmp_path / 'models'), bundled_path=bundled_copy)
+    predictor = AQIPredictor(model_store=store)
+
+    loaded = predictor.serving_model()
+    assert loaded.version == 'bundled'
+    assert len(loaded.features) == loaded.model.n_features_in_ == 6
+
+    # Delhi is North (1.2) and Mega (1.4); January is winter (1.3)
+    predicted = predictor.predict_many(['Delhi'], [30.0], [60.0], [5.0], months=[1], store=False)
+    by_hand = dict(temperature=30.0, humidity=60.0, wind_speed=5.0,
+                   region_factor=1.2, size_factor=1.4, season_factor=1.3)
+    expected = joblib.load(bundled_copy).predict(np.array([[by_hand[name] for name in loaded.features]]))
+    np.testing.assert_allclose(predicted, expected)
+
+
+def test_bundled_model_without_a_sidecar_is_not_unpickled(bundled_copy, tmp_path):
+    store = ModelStore(model_dir=str(tmp_path / 'models'), bundled_path=bundled_copy)
+    with mock.patch('joblib.load') as load:
+        assert store.get() is None
+    load.assert_not_called()
+
+
+def test_formula_path_builds_no_feature_frame(tmp_path):
+    store = ModelStore(model_dir=str(tmp_path), bundled_path=str(tmp_path / 'missing.pkl'))
+    predictor = AQIPredictor(model_store=store)
+    with mock.patch('utils.predictor.build_features', side_effect=AssertionError):
+        predicted = predictor.predict_many(['Delhi', 'Kochi'], [30.0, 30.0], [60.0, 60.0], [5.0, 5.0],
+                                           store=False)
+    assert predicted.shape == (2,)
+    assert os.listdir(tmp_path) == []
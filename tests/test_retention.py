@@ -0,0 +1,120 @@
+import os
+from datetime import datetime
+
+import pandas as pd
+import pytest
+from sqlalchemy import delete, func, select
+
+from utils import retention
+from utils.database import AirQualityRecord, CompactionWatermark
+from utils.rollups import get_rollup_data, update_rollups
+from utils.retention import run_retention
+
+pytest.importorskip('pyarrow')
+
+NOW = datetime(2025, 6, 15, 12)
+TABLE = AirQualityRecord.__table__
+
+
+@pytest.fixture
+def history(db, insert_readings):
+    # Raw readings every 6 hours from mid-morning on 2024-12-10, plus daily predictions
+    insert_readings('Delhi', datetime(2024, 12, 10, 9), 740, freq='6h', seed=1)
+    insert_readings('Pune', datetime(2024, 12, 10, 9), 740, freq='6h', seed=2)
+    insert_readings('Delhi', datetime(2025, 4, 1), 76, freq='D', is_prediction=1, seed=3)
+    update_rollups(db)
+
+
+def _ids(db):
+    return set(db.execute(select(TABLE.c.id)).scalars())
+
+
+def _archived_ids(archive_dir):
+    parts = [os.path.join(root, name) for root, _, names in os.walk(archive_dir)
+             for name in names if name.endswith('.parquet')]
+    return [int(value) for path in parts for value in pd.read_parquet(path)['id']]
+
+
+def _count(db, condition):
+    return db.execute(select(func.count()).where(condition)).scalar()
+
+
+def test_dry_run_reports_without_changing_anything(db, history, tmp_path):
+    before = _ids(db)
+    report = run_retention(db, now=NOW, prediction_ttl_days=30, raw_retention_days=90,
+                           archive_dir=str(tmp_path / 'archive'), dry_run=True)
+
+    assert report.raw_cutoff == datetime(2025, 3, 1)
+    assert report.raw_deleted == _count(db, (TABLE.c.is_prediction == 0) & (TABLE.c.date < report.raw_cutoff))
+    assert report.predictions_deleted == _count(
+        db, (TABLE.c.is_prediction == 1) & (TABLE.c.date < report.prediction_cutoff))
+    assert report.raw_deleted > 0 and report.predictions_deleted > 0
+    assert _ids(db) == before
+    assert not (tmp_path / 'archive').exists()
+    assert db.execute(select(func.count()).select_from(CompactionWatermark)).scalar() == 0
+
+
+def test_every_deleted_row_is_archived(db, history, tmp_path):
+    before = _ids(db)
+    report = run_retention(db, now=NOW, prediction_ttl_days=30, raw_retention_days=90,
+                           archive_dir=str(tmp_path), batch_size=97)
+
+    deleted = before - _ids(db)
+    archived = _archived_ids(tmp_path)
+    assert len(archived) == len(set(archived)) == report.archived_rows
+    assert set(archived) == deleted
+    assert report.raw_deleted + report.predictions_deleted == len(deleted)
+    assert _count(db, (TABLE.c.is_prediction == 0) & (TABLE.c.date < report.raw_cutoff)) == 0
+    assert _count(db, (TABLE.c.is_prediction == 1) & (TABLE.c.date < report.prediction_cutoff)) == 0
+    assert _count(db, TABLE.c.is_prediction == 1) > 0
+
+
+def test_row_expiring_mid_run_is_archived_before_deletion(db, history, tmp_path, monkeypatch):
+    write_archive = retention.write_archive
+    late = []
+
+    def write_and_backfill(chunks, path):
+        written = write_archive(chunks, path)
+        if not late:
+            # A late backfill of an old reading lands while the first batch is being archived
+            late.append(db.execute(TABLE.insert().values(
+                city='Delhi', date=datetime(2024, 12, 20), aqi=1.0, temperature=1.0,
+                humidity=1.0, wind_speed=1.0, is_prediction=0
+            )).inserted_primary_key[0])
+        return written
+
+    monkeypatch.setattr(retention, 'write_archive', write_and_backfill)
+    before = _ids(db)
+    run_retention(db, now=NOW, prediction_ttl_days=30, raw_retention_days=90,
+                  archive_dir=str(tmp_path), batch_size=200)
+
+    deleted = (before | set(late)) - _ids(db)
+    assert late[0] in deleted
+    assert set(_archived_ids(tmp_path)) == deleted
+
+
+def test_rollups_of_compacted_periods_survive_a_full_rebuild(db, history, tmp_path):
+    expected = {resolution: get_rollup_data('Delhi', db, resolution) for resolution in ('day', 'week', 'month')}
+    run_retention(db, now=NOW, prediction_ttl_days=30, raw_retention_days=90, archive_dir=str(tmp_path))
+
+    assert db.get(CompactionWatermark, 'Delhi').compacted_before == datetime(2025, 3, 1)
+    update_rollups(db)
+    for resolution, frame in expected.items():
+        pd.testing.assert_frame_equal(get_rollup_data('Delhi', db, resolution), frame)
+
+
+def test_periods_before_the_watermark_are_never_rebuilt(db, insert_readings):
+    insert_readings('Delhi', datetime(2025, 1, 1), 24 * 90)
+    update_rollups(db)
+    weekly = get_rollup_data('Delhi', db, 'week')
+
+    # Compact January: 2025-02-01 is a Saturday, so the week of 2025-01-27 straddles it
+    db.add(CompactionWatermark(city='Delhi', compacted_before=datetime(2025, 2, 1)))
+    db.execute(delete(TABLE).where(TABLE.c.date < datetime(2025, 2, 1)))
+    db.commit()
+    update_rollups(db)
+    update_rollups(db, ['Delhi'], since=datetime(2025, 2, 1))
+
+    assert get_rollup_data('Delhi', db, 'month').iloc[0]['readings'] == 24 * 31
+    after = get_rollup_data('Delhi', db, 'week')
+    assert after[after['date'] < datetime(2025, 2, 3)].equals(weekly[weekly['date'] < datetime(2025, 2, 3)])
@@ -0,0 +1,67 @@
+import threading
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import select, update
+from sqlalchemy.orm import sessionmaker
+
+from conftest import readings_frame
+from utils import rollups
+from utils.database import AirQualityRecord, copy_records
+from utils.rollups import get_rollup_data, update_rollups
+
+TABLE = AirQualityRecord.__table__
+
+
+def test_full_rebuild_recomputes_a_partial_first_period(db, insert_readings):
+    # Starts mid-afternoon on a Wednesday, partway into its day, week and month
+    insert_readings('Delhi', datetime(2025, 3, 5, 15), 24 * 40)
+    update_rollups(db)
+
+    first = db.execute(select(TABLE.c.id).order_by(TABLE.c.date).limit(1)).scalar()
+    db.execute(update(TABLE).where(TABLE.c.id == first).values(aqi=999.0))
+    db.commit()
+    update_rollups(db)
+
+    assert get_rollup_data('Delhi', db, 'day').iloc[0]['aqi_max'] == 999.0
+    assert get_rollup_data('Delhi', db, 'week').iloc[0]['aqi_max'] == 999.0
+    assert get_rollup_data('Delhi', db, 'month').iloc[0]['aqi_max'] == 999.0
+
+
+def test_full_rebuild_reads_one_city_at_a_time(db, insert_readings, monkeypatch):
+    insert_readings('Delhi', datetime(2025, 3, 1), 48)
+    insert_readings('Pune', datetime(2025, 3, 1), 48)
+    read_sql = pd.read_sql
+    read = []
+
+    def recording_read_sql(*args, **kwargs):
+        frame = read_sql(*args, **kwargs)
+        read.append(sorted(frame['city'].unique()))
+        return frame
+
+    monkeypatch.setattr(rollups.pd, 'read_sql', recording_read_sql)
+    assert update_rollups(db) > 0
+    assert read == [['Delhi'], ['Pune']]
+
+
+def test_rebuilds_of_one_city_are_serialized(postgres_engine):
+    Session = sessionmaker(bind=postgres_engine)
+    with Session() as loader:
+        copy_records(loader, readings_frame('Delhi', datetime(2025, 3, 1), 48))
+
+    holder, waiter = Session(), Session()
+    rollups._lock_city(holder, 'Delhi')
+    rebuild = threading.Thread(target=update_rollups, args=(waiter, ['Delhi']))
+    rebuild.start()
+    rebuild.join(0.5)
+    assert rebuild.is_alive()
+    # Another city is not blocked
+    with Session() as other:
+        assert update_rollups(other, ['Pune']) == 0
+
+    holder.commit()
+    rebuild.join(10)
+    assert not rebuild.is_alive()
+    assert len(get_rollup_data('Delhi', waiter, 'day')) == 2
+    holder.close()
+    waiter.close()
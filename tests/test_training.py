@@ -0,0 +1,21 @@
+from datetime import datetime
+from unittest import mock
+
+import pytest
+
+from utils.model_store import ModelStore
+from utils.training import train_incremental
+
+
+def test_interrupted_publish_is_completed_by_the_next_run(db, insert_readings, tmp_path):
+    insert_readings('Delhi', datetime(2025, 1, 1), 500)
+    store = ModelStore(model_dir=str(tmp_path))
+
+    with mock.patch.object(store, 'publish', side_effect=KeyboardInterrupt):
+        with pytest.raises(KeyboardInterrupt):
+            train_incremental(db, store=store, chunk_size=100)
+
+    version = train_incremental(db, store=store, chunk_size=100)
+    assert version is not None and version.endswith('-id500')
+    assert store.reload().version == version
+    assert train_incremental(db, store=store, chunk_size=100) is None
@@ -0,0 +1,35 @@
+import argparse
+import logging
+
+from utils.database import get_db
+from utils.training import train_incremental
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Incrementally train the AQI model on new air_quality_records rows"
+    )
+    parser.add_argument("--chunk-size", type=int, default=50000, help="Rows fetched and fitted per step")
+    parser.add_argument("--full", action="store_true",
+                        help="Ignore the saved high-water mark and retrain from the first row")
+    parser.add_argument("--no-activate", action="store_true",
+                        help="Publish the new version without making it the served model")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    db = next(get_db())
+    try:
+        version = train_incremental(db, chunk_size=args.chunk_size, full=args.full,
+                                    activate=not args.no_activate)
+    finally:
+        db.close()
+
+    if version is None:
+        print("No new rows since the last run; model unchanged")
+    else:
+        print(f"Published model {version}")
+
+
+if __name__ == "__main__":
+    main()
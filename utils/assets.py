@@ -0,0 +1,93 @@
+import base64
+import hashlib
+import io
+import os
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from . import metrics
+
+STATIC_DIR = 'static'
+# Resized copies served through Streamlit's static route
+CACHE_DIR = os.path.join(STATIC_DIR, 'cache')
+FALLBACK_IMAGE = 'images/default.jpg'
+
+_MIME_TYPES = {'JPEG': 'image/jpeg', 'PNG': 'image/png'}
+
+
+def _static_serving_enabled() -> bool:
+    try:
+        import streamlit as st
+        return bool(st.get_option('server.enableStaticServing'))
+    except Exception:
+        return False
+
+
+@lru_cache(maxsize=None)
+def _prepared_image(path: str, width: Optional[int], height: Optional[int],
+                    square: bool) -> Optional[Tuple[bytes, str]]:
+    """Return an image resized to its display size as (bytes, PIL format)"""
+    if not os.path.exists(path):
+        if path == FALLBACK_IMAGE:
+            return None
+        return _prepared_image(FALLBACK_IMAGE, width, height, square)
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        # Without Pillow the original file is served unchanged
+        with open(path, 'rb') as handle:
+            return handle.read(), 'PNG' if path.lower().endswith('.png') else 'JPEG'
+
+    with metrics.span('assets.resize'), Image.open(path) as image:
+        image = ImageOps.exif_transpose(image)
+        if square and width:
+            image = ImageOps.fit(image, (width, width), Image.LANCZOS)
+        elif width or height:
+            image.thumbnail((width or image.width, height or image.height), Image.LANCZOS)
+        buffer = io.BytesIO()
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image_format = 'PNG'
+            image.save(buffer, image_format, optimize=True)
+        else:
+            image_format = 'JPEG'
+            image.convert('RGB').save(buffer, image_format, quality=85, optimize=True)
+    return buffer.getvalue(), image_format
+
+
+@lru_cache(maxsize=None)
+def image_src(path: str, width: Optional[int] = None, height: Optional[int] = None,
+              square: bool = False) -> str:
+    """Return an ``<img src>`` value for a local image, resized and encoded once per process.
+
+    With ``server.enableStaticServing`` on, the resized copy is written to
+    ``static/cache`` and referenced with a content hash, which Streamlit's
+    static route answers with long-lived cache headers. Otherwise a data URI
+    built from the in-memory copy is returned.
+    """
+    prepared = _prepared_image(path, width, height, square)
+    if prepared is None:
+        return ''
+    data, image_format = prepared
+
+    if _static_serving_enabled():
+        digest = hashlib.sha1(data).hexdigest()[:16]
+        extension = 'png' if image_format == 'PNG' else 'jpg'
+        filename = f"{digest}.{extension}"
+        target = os.path.join(CACHE_DIR, filename)
+        if not os.path.exists(target):
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp_path = f"{target}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as handle:
+                handle.write(data)
+            os.replace(tmp_path, target)
+        # Tornado serves versioned (?v=) static URLs with a ten-year max-age
+        return f"app/static/cache/{filename}?v={digest}"
+
+    return f"data:{_MIME_TYPES[image_format]};base64,{base64.b64encode(data).decode()}"
+
+
+@lru_cache(maxsize=None)
+def read_text_asset(path: str) -> str:
+    """Return the contents of a text asset such as a stylesheet, read once per process"""
+    with open(path) as handle:
+        return handle.read()
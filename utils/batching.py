@@ -0,0 +1,88 @@
+import asyncio
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+class MicroBatcher:
+    """Coalesces concurrent asyncio calls into one batched function call.
+
+    ``submit`` queues an item and waits for its result. The pending items
+    are handed to ``process_batch`` (a blocking function run in
+    ``executor``) once ``max_batch`` items are waiting or ``max_delay``
+    seconds after the first item of the batch arrived. ``process_batch``
+    must return one result per item, in order; if it raises or returns a
+    different number of results, every caller in the batch gets an
+    exception.
+    """
+
+    def __init__(self, process_batch: Callable[[List[Any]], Sequence[Any]], max_batch: int = 1024,
+                 max_delay: float = 0.005, executor: Optional[Executor] = None):
+        self.process_batch = process_batch
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.executor = executor
+        self._items: List[Any] = []
+        self._futures: List[asyncio.Future] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._counters = {
+            'items': 0,
+            'batches': 0,
+            'failed_batches': 0,
+            'max_batch_seen': 0,
+            'last_batch_seconds': 0.0,
+            'total_batch_seconds': 0.0,
+        }
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and return its result once its batch has run"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._items.append(item)
+        self._futures.append(future)
+        if len(self._items) >= self.max_batch:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._dispatch)
+        return await future
+
+    def stats(self) -> Dict:
+        """Return batch counters and the number of items waiting"""
+        stats = dict(self._counters)
+        stats['pending'] = len(self._items)
+        return stats
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._items:
+            return
+        items, futures = self._items, self._futures
+        self._items, self._futures = [], []
+        asyncio.get_running_loop().create_task(self._run(items, futures))
+
+    async def _run(self, items: List[Any], futures: List[asyncio.Future]) -> None:
+        started = time.perf_counter()
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.process_batch, items
+            )
+            if len(results) != len(items):
+                raise ValueError(f"process_batch returned {len(results)} results for {len(items)} items")
+        except Exception as exc:
+            self._counters['failed_batches'] += 1
+            for future in futures:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        elapsed = time.perf_counter() - started
+        self._counters['items'] += len(items)
+        self._counters['batches'] += 1
+        self._counters['max_batch_seen'] = max(self._counters['max_batch_seen'], len(items))
+        self._counters['last_batch_seconds'] = elapsed
+        self._counters['total_batch_seconds'] += elapsed
+        for future, result in zip(futures, results):
+            # Callers that disconnected may have cancelled their future
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,146 @@
+import json
+import logging
+import os
+from contextlib import suppress
+from datetime import datetime
+from typing import Iterator, Optional, Set, Tuple
+
+import pandas as pd
+from sqlalchemy import Column, DateTime, Float, Integer, MetaData, String, Table, delete, text
+from sqlalchemy.orm import Session
+
+from .data_generator import notify_history_written
+from .database import AirQualityRecord, RECORD_COLUMNS, copy_records
+
+logger = logging.getLogger(__name__)
+
+DEDUP_KEY = ['city', 'date', 'is_prediction']
+
+_staging_metadata = MetaData()
+staging_table = Table(
+    'air_quality_import_staging', _staging_metadata,
+    Column('city', String),
+    Column('date', DateTime),
+    Column('aqi', Float),
+    Column('temperature', Float),
+    Column('humidity', Float),
+    Column('wind_speed', Float),
+    Column('is_prediction', Integer),
+    prefixes=['TEMPORARY'],
+)
+
+
+def iter_source_chunks(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Stream a CSV, gzip CSV or Parquet dump in chunks of at most ``chunk_size`` rows"""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, parse_dates=['date'])
+
+
+def normalize_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Keep the record columns, drop unusable rows and in-chunk duplicates"""
+    chunk = chunk.reindex(columns=RECORD_COLUMNS)
+    chunk = chunk.dropna(subset=['city', 'date'])
+    chunk['date'] = pd.to_datetime(chunk['date'])
+    chunk['is_prediction'] = chunk['is_prediction'].fillna(0).astype(int)
+    return chunk.drop_duplicates(subset=DEDUP_KEY)
+
+
+def _checkpoint_path(path: str) -> str:
+    return f"{path}.import-state.json"
+
+
+def _source_signature(path: str, chunk_size: int) -> dict:
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'chunk_size': chunk_size}
+
+
+def _load_checkpoint(path: str, chunk_size: int) -> Tuple[int, Set[str], Optional[datetime]]:
+    """Return (chunks done, cities with new history, oldest history date) from a checkpoint"""
+    try:
+        with open(_checkpoint_path(path)) as handle:
+            state = json.load(handle)
+    except (FileNotFoundError, ValueError):
+        return 0, set(), None
+    if state.get('source') != _source_signature(path, chunk_size):
+        return 0, set(), None
+    since = state.get('history_since')
+    return (int(state.get('chunks_done', 0)), set(state.get('history_cities', [])),
+            datetime.fromisoformat(since) if since else None)
+
+
+def _save_checkpoint(path: str, chunk_size: int, chunks_done: int,
+                     history_cities: Set[str], history_since: Optional[datetime]) -> None:
+    tmp_path = _checkpoint_path(path) + '.tmp'
+    with open(tmp_path, 'w') as handle:
+        json.dump({
+            'source': _source_signature(path, chunk_size),
+            'chunks_done': chunks_done,
+            # Rollups and caches are refreshed once at the end, including for chunks of earlier runs
+            'history_cities': sorted(history_cities),
+            'history_since': history_since.isoformat() if history_since else None,
+        }, handle)
+    os.replace(tmp_path, _checkpoint_path(path))
+
+
+def merge_chunk(db: Session, chunk: pd.DataFrame) -> int:
+    """Load a chunk into the staging table and insert the rows not already stored.
+
+    The NOT EXISTS anti-join probes the composite (city, is_prediction, date)
+    history index once per staged row, so the cost grows with the chunk,
+    not the table. No unique constraint backs it, because existing tables
+    may already hold duplicate readings. Returns the number of new rows.
+    """
+    connection = db.connection()
+    staging_table.create(connection, checkfirst=True)
+    db.execute(delete(staging_table))
+    copy_records(db, chunk, table=staging_table, commit=False)
+    columns = ', '.join(RECORD_COLUMNS)
+    staged_columns = ', '.join(f"s.{column}" for column in RECORD_COLUMNS)
+    inserted = db.execute(text(
+        f"INSERT INTO {AirQualityRecord.__tablename__} ({columns}) "
+        f"SELECT {staged_columns} FROM {staging_table.name} s "
+        f"WHERE NOT EXISTS (SELECT 1 FROM {AirQualityRecord.__tablename__} r "
+        "WHERE r.city = s.city AND r.date = s.date AND r.is_prediction = s.is_prediction)"
+    )).rowcount
+    db.execute(delete(staging_table))
+    db.commit()
+    return inserted
+
+
+def import_records(db: Session, path: str, chunk_size: int = 50000, resume: bool = True) -> int:
+    """Import an export dump idempotently, deduplicating on (city, date, is_prediction).
+
+    Every chunk is merged in its own transaction and recorded in a
+    ``<path>.import-state.json`` checkpoint, so an interrupted import resumes
+    at the next chunk. Re-running a finished import inserts nothing. Returns
+    the number of new rows.
+    """
+    skip, history_cities, history_since = _load_checkpoint(path, chunk_size) if resume else (0, set(), None)
+    if skip:
+        logger.info("Resuming %s after %d chunks", path, skip)
+
+    inserted = 0
+    for index, chunk in enumerate(iter_source_chunks(path, chunk_size)):
+        if index < skip:
+            continue
+        chunk = normalize_chunk(chunk)
+        if not chunk.empty:
+            inserted += merge_chunk(db, chunk)
+            history = chunk[chunk['is_prediction'] == 0]
+            if not history.empty:
+                history_cities.update(history['city'].unique())
+                oldest = history['date'].min().to_pydatetime()
+                history_since = oldest if history_since is None else min(history_since, oldest)
+        _save_checkpoint(path, chunk_size, index + 1, history_cities, history_since)
+        logger.info("Imported chunk %d (%d new rows so far)", index + 1, inserted)
+
+    if history_cities:
+        notify_history_written(db, sorted(history_cities), since=history_since)
+    # A source without chunks (such as an empty delta export) never wrote one
+    with suppress(FileNotFoundError):
+        os.remove(_checkpoint_path(path))
+    return inserted
@@ -1,5 +1,10 @@
 import json
-from typing import Dict, List
+import zlib
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
 
 # Comprehensive list of Indian cities organized by state and region
 INDIAN_CITIES_DATA: Dict[str, Dict[str, List[str]]] = {
@@ -83,7 +88,7 @@ INDIAN_CITIES_DATA: Dict[str, Dict[str, List[str]]] = {
             "Tezpur", "Karimganj"
         ],
         "Meghalaya": ["Shillong", "Tura", "Jowai", "Nongstoin", "Williamnagar"],
-        "Tripura": ["Agartala", "Udaipur", "Dharmanagar", "Kailasahar"],
+        "Tripura": ["Agartala", "Udaipur (Tripura)", "Dharmanagar", "Kailasahar"],
         "Manipur": ["Imphal", "Thoubal", "Kakching", "Ukhrul"],
         "Nagaland": ["Kohima", "Dimapur", "Mokokchung", "Tuensang"],
         "Arunachal Pradesh": ["Itanagar", "Naharlagun", "Pasighat", "Tawang"],
@@ -99,13 +104,12 @@ def get_all_cities() -> List[str]:
             all_cities.extend(state_cities)
     return sorted(all_cities)
 
-def get_region_and_state(city: str) -> tuple:
+def get_region_and_state(city: str, state: Optional[str] = None) -> tuple:
     """Return the region and state for a given city"""
-    for region, states in INDIAN_CITIES_DATA.items():
-        for state, cities in states.items():
-            if city in cities:
-                return region, state
-    return "Other", "Other"
+    city_id = CITY_REGISTRY.city_id(city, state)
+    if city_id == CityRegistry.UNKNOWN:
+        return "Other", "Other"
+    return CITY_REGISTRY.regions[city_id], CITY_REGISTRY.states[city_id]
 
 # Population size categories (for pollution factor calculation)
 CITY_SIZES = {
@@ -114,10 +118,203 @@ CITY_SIZES = {
     # Add more categories as needed
 }
 
+SIZE_FACTORS = {"Mega": 1.4, "Large": 1.2}
+
+REGION_FACTORS = {
+    "North": 1.2,  # Higher pollution in North India
+    "South": 0.8,  # Lower pollution in South India
+    "East": 1.0,   # Moderate pollution in East India
+    "West": 1.1,   # Slightly higher pollution in West India
+    "Northeast": 0.7  # Lower pollution in Northeast India
+}
+
+# City-specific pollution factors used by the predictor
+CITY_FACTORS = {
+    # North India (generally higher pollution levels)
+    'Delhi': 1.5, 'Gurugram': 1.45, 'Noida': 1.45, 'Chandigarh': 1.1,
+    'Lucknow': 1.3, 'Kanpur': 1.35, 'Varanasi': 1.25, 'Patna': 1.3,
+    'Jaipur': 1.2, 'Jodhpur': 1.15,
+
+    # West India (moderate pollution levels)
+    'Mumbai': 1.2, 'Pune': 0.95, 'Ahmedabad': 1.1, 'Surat': 1.0,
+    'Nagpur': 0.9, 'Indore': 1.05, 'Bhopal': 1.0,
+
+    # South India (generally lower pollution levels)
+    'Bangalore': 0.9, 'Chennai': 1.0, 'Hyderabad': 0.95, 'Kochi': 0.7,
+    'Thiruvananthapuram': 0.65, 'Mysuru': 0.75, 'Coimbatore': 0.8,
+    'Visakhapatnam': 0.85, 'Mangalore': 0.7,
+
+    # East India (varied pollution levels)
+    'Kolkata': 1.3, 'Bhubaneswar': 0.95, 'Guwahati': 0.9,
+    'Shillong': 0.7, 'Gangtok': 0.65, 'Imphal': 0.75
+}
+
+# Baseline AQI based on typical Indian city patterns
+BASE_AQI = {
+    # North India
+    'Delhi': 150, 'Gurugram': 140, 'Noida': 145, 'Chandigarh': 95,
+    'Lucknow': 130, 'Kanpur': 135, 'Varanasi': 120, 'Patna': 125,
+    'Jaipur': 110, 'Jodhpur': 100,
+
+    # West India
+    'Mumbai': 95, 'Pune': 85, 'Ahmedabad': 105, 'Surat': 90,
+    'Nagpur': 80, 'Indore': 95, 'Bhopal': 90,
+
+    # South India
+    'Bangalore': 70, 'Chennai': 80, 'Hyderabad': 85, 'Kochi': 60,
+    'Thiruvananthapuram': 55, 'Mysuru': 65, 'Coimbatore': 70,
+    'Visakhapatnam': 75, 'Mangalore': 60,
+
+    # East India
+    'Kolkata': 110, 'Bhubaneswar': 85, 'Guwahati': 80,
+    'Shillong': 60, 'Gangtok': 55, 'Imphal': 65
+}
+
+DEFAULT_BASE_AQI = 80.0
+
+def _read_only(values: List[float]) -> np.ndarray:
+    array = np.asarray(values, dtype=np.float64)
+    array.setflags(write=False)
+    return array
+
+@dataclass(frozen=True, eq=False)
+class CityRegistry:
+    """Immutable index of every known city with array-backed factors.
+
+    Each (city, state) pair gets an integer id. The factor arrays are indexed
+    by that id and carry one extra trailing slot holding the defaults for
+    unknown cities, so ``array[CityRegistry.UNKNOWN]`` is always valid.
+    """
+    names: Tuple[str, ...]
+    states: Tuple[str, ...]
+    regions: Tuple[str, ...]
+    sizes: Tuple[str, ...]
+    region_factors: np.ndarray
+    size_factors: np.ndarray
+    city_factors: np.ndarray
+    base_aqi: np.ndarray
+    _ids_by_name: Mapping[str, Tuple[int, ...]]
+    _id_by_name_and_state: Mapping[Tuple[str, str], int]
+
+    UNKNOWN = -1
+
+    @classmethod
+    def build(cls, data: Dict[str, Dict[str, List[str]]]) -> "CityRegistry":
+        """Build the registry from a region -> state -> cities mapping"""
+        entries = [
+            (city, state, region)
+            for region, states in data.items()
+            for state, cities in states.items()
+            for city in cities
+        ]
+        # Cities with known constants that are missing from the state lists
+        known = {city for city, _, _ in entries}
+        for city in sorted((set(CITY_FACTORS) | set(BASE_AQI)) - known):
+            entries.append((city, "Other", "Other"))
+
+        size_by_name = {city: size for size, cities in CITY_SIZES.items() for city in cities}
+        names, states, regions, sizes = [], [], [], []
+        region_factors, size_factors, city_factors, base_aqi = [], [], [], []
+        ids_by_name: Dict[str, List[int]] = {}
+        id_by_name_and_state: Dict[Tuple[str, str], int] = {}
+
+        for city_id, (city, state, region) in enumerate(entries):
+            size = size_by_name.get(city, "Other")
+            region_factor = REGION_FACTORS.get(region, 1.0)
+            size_factor = SIZE_FACTORS.get(size, 1.0)
+            names.append(city)
+            states.append(state)
+            regions.append(region)
+            sizes.append(size)
+            region_factors.append(region_factor)
+            size_factors.append(size_factor)
+            city_factors.append(CITY_FACTORS.get(city, region_factor * size_factor))
+            base_aqi.append(BASE_AQI.get(city, DEFAULT_BASE_AQI * region_factor * size_factor))
+            ids_by_name.setdefault(city, []).append(city_id)
+            id_by_name_and_state.setdefault((city, state), city_id)
+
+        # Trailing slot for unknown cities
+        region_factors.append(1.0)
+        size_factors.append(1.0)
+        city_factors.append(1.0)
+        base_aqi.append(DEFAULT_BASE_AQI)
+
+        return cls(
+            names=tuple(names),
+            states=tuple(states),
+            regions=tuple(regions),
+            sizes=tuple(sizes),
+            region_factors=_read_only(region_factors),
+            size_factors=_read_only(size_factors),
+            city_factors=_read_only(city_factors),
+            base_aqi=_read_only(base_aqi),
+            _ids_by_name=MappingProxyType({k: tuple(v) for k, v in ids_by_name.items()}),
+            _id_by_name_and_state=MappingProxyType(id_by_name_and_state),
+        )
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def city_id(self, city: str, state: Optional[str] = None) -> int:
+        """Return the id of a city, or ``UNKNOWN``.
+
+        Names shared by several states resolve to the first listed entry
+        unless ``state`` is given.
+        """
+        if state is not None:
+            return self._id_by_name_and_state.get((city, state), self.UNKNOWN)
+        ids = self._ids_by_name.get(city)
+        return ids[0] if ids else self.UNKNOWN
+
+    def ids_for_name(self, city: str) -> Tuple[int, ...]:
+        """Return every id registered under a city name"""
+        return self._ids_by_name.get(city, ())
+
+    def ids(self, cities: Sequence[str], states: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Return an id array for a batch of city names"""
+        cities = np.asarray(cities, dtype=object)
+        if states is None:
+            unique_cities, inverse = np.unique(cities.astype(str), return_inverse=True)
+            unique_ids = np.fromiter(
+                (self.city_id(city) for city in unique_cities),
+                dtype=np.int64, count=len(unique_cities)
+            )
+            return unique_ids[inverse]
+        return np.fromiter(
+            (self.city_id(city, state) for city, state in zip(cities, states)),
+            dtype=np.int64, count=len(cities)
+        )
+
+    def ids_in(self, region: Optional[str] = None, state: Optional[str] = None) -> np.ndarray:
+        """Return the ids of all cities in a region and/or state"""
+        return np.array([
+            city_id for city_id in range(len(self))
+            if (region is None or self.regions[city_id] == region)
+            and (state is None or self.states[city_id] == state)
+        ], dtype=np.int64)
+
+CITY_REGISTRY = CityRegistry.build(INDIAN_CITIES_DATA)
+
+def get_regions() -> List[str]:
+    """Return every region in the registry"""
+    return sorted(set(CITY_REGISTRY.regions))
+
+def get_states(region: Optional[str] = None) -> List[str]:
+    """Return the states in a region, or every state"""
+    return sorted({state for state, city_region in zip(CITY_REGISTRY.states, CITY_REGISTRY.regions)
+                   if region is None or city_region == region})
+
+def get_cities_in(region: Optional[str] = None, state: Optional[str] = None) -> List[str]:
+    """Return the distinct city names in a region and/or state"""
+    return sorted({CITY_REGISTRY.names[city_id] for city_id in CITY_REGISTRY.ids_in(region, state)})
+
 def get_city_size_factor(city: str) -> float:
     """Return a population-based factor for the city"""
-    if city in CITY_SIZES["Mega"]:
-        return 1.4
-    elif city in CITY_SIZES["Large"]:
-        return 1.2
-    return 1.0
+    return float(CITY_REGISTRY.size_factors[CITY_REGISTRY.city_id(city)])
+
+def city_seed(city: str, state: Optional[str] = None) -> int:
+    """Return a stable 32-bit seed for a city, the same in every process and on every machine"""
+    if state is None:
+        city_id = CITY_REGISTRY.city_id(city)
+        state = CITY_REGISTRY.states[city_id] if city_id != CityRegistry.UNKNOWN else ''
+    return zlib.crc32(f"{state}/{city}".encode('utf-8'))
@@ -1,108 +1,340 @@
+import os
+import threading
+import time
+from collections import OrderedDict
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from .database import AirQualityRecord, get_db
+from . import metrics
+from .database import AirQualityRecord, AQIRollup, copy_records, get_db
+from sqlalchemy import Date, cast, func, select
 from sqlalchemy.orm import Session
-from typing import List
-from .cities_data import get_all_cities, get_region_and_state, get_city_size_factor
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from .cities_data import CITY_REGISTRY, city_seed, get_all_cities
+from .rollups import get_rollup_data, update_rollups
+
+def generate_historical_frame(cities: Sequence[str], days: int = 30,
+                              end: Optional[datetime] = None,
+                              rng: Optional[np.random.Generator] = None) -> pd.DataFrame:
+    """Generate mock daily AQI readings for many cities in one vectorized pass"""
+    if rng is None:
+        rng = np.random.default_rng()
+    if end is None:
+        end = datetime.now()
+
+    cities = np.asarray(list(cities), dtype=object)
+    shape = (len(cities), days)
+
+    # One row of dates shared by every city, oldest first
+    dates = pd.DatetimeIndex([end - timedelta(days=days - i) for i in range(days)])
+    # Add seasonal variations (higher in winter)
+    season_factor = np.where(dates.month.isin([11, 12, 1]), 1.2, 0.8)
+
+    # Baseline AQI from the city registry (region and size adjusted for unlisted cities)
+    base_aqi_value = CITY_REGISTRY.base_aqi[CITY_REGISTRY.ids(cities)]
+
+    aqi = np.clip(rng.normal(loc=base_aqi_value[:, None], scale=30, size=shape) * season_factor, 0, 500)
+    temperature = rng.normal(30, 5, size=shape)  # Typical Indian temperatures
+    humidity = rng.normal(65, 15, size=shape)
+    wind_speed = rng.normal(12, 4, size=shape)
+
+    return pd.DataFrame({
+        'city': np.repeat(cities, days),
+        'date': np.tile(dates.to_numpy(), len(cities)),
+        'aqi': aqi.ravel(),
+        'temperature': temperature.ravel(),
+        'humidity': humidity.ravel(),
+        'wind_speed': wind_speed.ravel(),
+        'is_prediction': 0
+    })
+
+def store_historical_data(cities: Sequence[str], db: Session, days: int = 30,
+                          rng: Optional[np.random.Generator] = None) -> int:
+    """Generate and bulk load mock historical data for many cities"""
+    frame = generate_historical_frame(cities, days=days, rng=rng)
+    count = copy_records(db, frame)
+    if count:
+        notify_history_written(db, cities, since=frame['date'].min().to_pydatetime())
+    return count
+
+def notify_history_written(db: Session, cities: Sequence[str], since: Optional[datetime] = None) -> None:
+    """Refresh rollups and drop cached frames after new history rows are stored"""
+    update_rollups(db, cities, since=since)
+    for city in set(cities):
+        history_cache.invalidate(city)
 
 def generate_and_store_historical_data(city: str, db: Session) -> None:
     """Generate and store mock historical AQI data for a city"""
-    np.random.seed(hash(city) % 100)
-
-    # Adjust baseline AQI based on typical Indian city patterns
-    base_aqi = {
-        # North India
-        'Delhi': 150, 'Gurugram': 140, 'Noida': 145, 'Chandigarh': 95,
-        'Lucknow': 130, 'Kanpur': 135, 'Varanasi': 120, 'Patna': 125,
-        'Jaipur': 110, 'Jodhpur': 100,
-
-        # West India
-        'Mumbai': 95, 'Pune': 85, 'Ahmedabad': 105, 'Surat': 90,
-        'Nagpur': 80, 'Indore': 95, 'Bhopal': 90,
-
-        # South India
-        'Bangalore': 70, 'Chennai': 80, 'Hyderabad': 85, 'Kochi': 60,
-        'Thiruvananthapuram': 55, 'Mysuru': 65, 'Coimbatore': 70,
-        'Visakhapatnam': 75, 'Mangalore': 60,
-
-        # East India
-        'Kolkata': 110, 'Bhubaneswar': 85, 'Guwahati': 80,
-        'Shillong': 60, 'Gangtok': 55, 'Imphal': 65
-    }
+    store_historical_data([city], db, rng=np.random.default_rng(np.random.SeedSequence(city_seed(city))))
+
+def warm_historical_data(db: Session, cities: Optional[Sequence[str]] = None,
+                         days: int = 30, seed: Optional[int] = None) -> List[str]:
+    """Pre-populate history for every city that has none yet.
 
-    # Get region and state-based factors
-    region, state = get_region_and_state(city)
-    region_factors = {
-        "North": 1.2,  # Higher pollution in North India
-        "South": 0.8,  # Lower pollution in South India
-        "East": 1.0,   # Moderate pollution in East India
-        "West": 1.1,   # Slightly higher pollution in West India
-        "Northeast": 0.7  # Lower pollution in Northeast India
+    Returns the cities that were seeded.
+    """
+    if cities is None:
+        cities = get_all_cities()
+    existing = {
+        city for (city,) in db.query(AirQualityRecord.city)
+        .filter(AirQualityRecord.is_prediction == 0)
+        .distinct()
     }
-    region_factor = region_factors.get(region, 1.0)
+    missing = sorted(set(cities) - existing)
+    store_historical_data(missing, db, days=days, rng=np.random.default_rng(seed))
+    return missing
+
+class HistoryCache:
+    """Thread-safe LRU cache of historical DataFrames with TTL and memory cap.
+
+    Entries are keyed by ``(city, start, end, limit, resolution)``; comparison
+    frames use a tuple of cities in place of the city, and are dropped when
+    any of them is invalidated. The least recently used
+    entries are evicted once ``max_entries`` or ``max_bytes`` is exceeded,
+    and entries older than ``ttl`` seconds are treated as missing.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple, Tuple[float, int, pd.DataFrame]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple) -> Optional[pd.DataFrame]:
+        """Return a cached frame, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key: Tuple, frame: pd.DataFrame) -> None:
+        """Cache a frame, evicting least recently used entries as needed"""
+        size = int(frame.memory_usage(index=True, deep=True).sum())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic(), size, frame)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, city: Optional[str] = None) -> None:
+        """Drop every entry for a city, or everything when city is None"""
+        with self._lock:
+            for key in [k for k in self._entries
+                        if city is None or k[0] == city or (isinstance(k[0], tuple) and city in k[0])]:
+                self._remove(key)
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes,
+                    'hits': self.hits, 'misses': self.misses}
+
+    def _remove(self, key: Tuple) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+history_cache = HistoryCache(
+    ttl=float(os.getenv('HISTORY_CACHE_TTL', '300')),
+    max_entries=int(os.getenv('HISTORY_CACHE_MAX_ENTRIES', '256')),
+    max_bytes=int(os.getenv('HISTORY_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+)
+
+HISTORY_COLUMNS = ['date', 'aqi', 'temperature', 'humidity', 'wind_speed']
+HISTORY_DTYPES = {'aqi': 'float32', 'temperature': 'float32', 'humidity': 'float32', 'wind_speed': 'float32'}
 
-    # Get city size factor
-    size_factor = get_city_size_factor(city)
+def _empty_history_frame() -> pd.DataFrame:
+    return pd.DataFrame({column: pd.Series(dtype=HISTORY_DTYPES.get(column, 'datetime64[ns]'))
+                         for column in HISTORY_COLUMNS})
 
-    # Calculate base AQI for this city
-    if city not in base_aqi:
-        base_aqi_value = 80  # Default value
-        base_aqi_value *= region_factor
-        base_aqi_value *= size_factor
+def _historical_query(city: str, start: Optional[datetime], end: Optional[datetime],
+                      limit: Optional[int]):
+    table = AirQualityRecord.__table__
+    stmt = (select(*(table.c[column] for column in HISTORY_COLUMNS))
+            .where(table.c.city == city)
+            .where(table.c.is_prediction == 0))
+    if start is not None:
+        stmt = stmt.where(table.c.date >= start)
+    if end is not None:
+        stmt = stmt.where(table.c.date < end)
+    stmt = stmt.order_by(table.c.date)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+def iter_historical_chunks(city: str, db: Session, start: Optional[datetime] = None,
+                           end: Optional[datetime] = None, limit: Optional[int] = None,
+                           chunk_size: int = 50000) -> Iterator[pd.DataFrame]:
+    """Stream historical rows for a city as typed DataFrame chunks.
+
+    Only the chart/table columns are selected, and rows are fetched through a
+    server-side cursor where the backend supports one.
+    """
+    # Options go on the statement so the session's connection is left untouched
+    stmt = _historical_query(city, start, end, limit).execution_options(
+        stream_results=True, max_row_buffer=chunk_size
+    )
+    for chunk in pd.read_sql(stmt, db.connection(), chunksize=chunk_size, dtype=HISTORY_DTYPES):
+        chunk['date'] = pd.to_datetime(chunk['date'])
+        yield chunk
+
+def _read_historical_frame(city: str, db: Session, start: Optional[datetime],
+                           end: Optional[datetime], limit: Optional[int]) -> pd.DataFrame:
+    chunks = list(iter_historical_chunks(city, db, start, end, limit))
+    if not chunks:
+        return _empty_history_frame()
+    return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+def _read_history(city: str, db: Session, start: Optional[datetime], end: Optional[datetime],
+                  limit: Optional[int], resolution: str) -> pd.DataFrame:
+    if resolution == 'raw':
+        return _read_historical_frame(city, db, start, end, limit)
+    frame = get_rollup_data(city, db, resolution, start, end)
+    return frame if limit is None else frame.head(limit)
+
+def get_historical_data(city: str, db: Session, start: Optional[datetime] = None,
+                        end: Optional[datetime] = None, limit: Optional[int] = None,
+                        resolution: str = 'raw', use_cache: bool = True,
+                        backfill: bool = True) -> pd.DataFrame:
+    """Get historical data for a city from database.
+
+    Returns the oldest ``limit`` readings in ``[start, end)`` with float32
+    measurements. With ``resolution`` set to 'day', 'week' or 'month' the
+    pre-aggregated rollups are returned instead (``aqi`` is the period mean).
+    A city with no stored history is backfilled with synthetic readings (or
+    its missing rollups are built) unless ``backfill`` is False, in which
+    case the read never writes and an empty frame is returned.
+    Results are served from ``history_cache`` when possible; the returned
+    frame is shared with the cache, so callers should not modify it in place.
+    """
+    key = (city, start, end, limit, resolution)
+    if use_cache:
+        cached = history_cache.get(key)
+        if cached is not None:
+            metrics.increment('history_cache_hits')
+            return cached
+        metrics.increment('history_cache_misses')
+
+    with metrics.span('history.read', resolution=resolution):
+        frame = _read_history(city, db, start, end, limit, resolution)
+
+    if frame.empty and not backfill:
+        # Not cached, so a later backfilling read still fills the city in
+        return frame
+
+    if frame.empty and start is None and end is None:
+        if resolution == 'raw' or _read_historical_frame(city, db, None, None, 1).empty:
+            # Generate data if none exists
+            with metrics.span('history.generate'):
+                generate_and_store_historical_data(city, db)
+        else:
+            # Readings stored before rollups existed
+            update_rollups(db, [city])
+        frame = _read_history(city, db, start, end, limit, resolution)
+
+    if use_cache:
+        history_cache.put(key, frame)
+    return frame
+
+def _day_bucket(column, dialect: str):
+    """Return a SQL expression truncating a timestamp column to its calendar day"""
+    if dialect == 'postgresql':
+        return func.date_trunc('day', column)
+    if dialect == 'sqlite':
+        return func.date(column)
+    return cast(column, Date)
+
+def _comparison_query(cities: Sequence[str], resolution: str, start: Optional[datetime],
+                      end: Optional[datetime], dialect: str):
+    if resolution == 'raw':
+        # Averaged per city and day in the database, so only one row per day leaves it
+        table = AirQualityRecord.__table__
+        date_column = table.c.date
+        day = _day_bucket(date_column, dialect)
+        stmt = (select(table.c.city, day.label('date'), func.avg(table.c.aqi).label('aqi'))
+                .where(table.c.is_prediction == 0)
+                .group_by(table.c.city, day))
     else:
-        base_aqi_value = base_aqi[city]
-
-    # Generate 30 days of data
-    for i in range(30):
-        date = datetime.now() - timedelta(days=30-i)
-
-        # Add seasonal and daily variations
-        season_factor = 1.2 if date.month in [11, 12, 1] else 0.8  # Higher in winter
-
-        # Convert numpy values to Python native types
-        aqi = float(np.clip(np.random.normal(loc=base_aqi_value, scale=30) * season_factor, 0, 500))
-        temperature = float(np.random.normal(30, 5))  # Typical Indian temperatures
-        humidity = float(np.random.normal(65, 15))
-        wind_speed = float(np.random.normal(12, 4))
-
-        record = AirQualityRecord(
-            city=city,
-            date=date,
-            aqi=aqi,
-            temperature=temperature,
-            humidity=humidity,
-            wind_speed=wind_speed,
-            is_prediction=0
-        )
-        db.add(record)
-
-    db.commit()
-
-def get_historical_data(city: str, db: Session) -> pd.DataFrame:
-    """Get historical data for a city from database"""
-    records = (db.query(AirQualityRecord)
-              .filter(AirQualityRecord.city == city)
-              .filter(AirQualityRecord.is_prediction == 0)
-              .order_by(AirQualityRecord.date)
-              .all())
-
-    if not records:
-        # Generate data if none exists
-        generate_and_store_historical_data(city, db)
-        records = (db.query(AirQualityRecord)
-                  .filter(AirQualityRecord.city == city)
-                  .filter(AirQualityRecord.is_prediction == 0)
-                  .order_by(AirQualityRecord.date)
-                  .all())
-
-    return pd.DataFrame([{
-        'date': r.date,
-        'aqi': r.aqi,
-        'temperature': r.temperature,
-        'humidity': r.humidity,
-        'wind_speed': r.wind_speed
-    } for r in records])
+        table = AQIRollup.__table__
+        date_column = table.c.period_start
+        stmt = (select(table.c.city, date_column.label('date'), table.c.aqi_mean.label('aqi'))
+                .where(table.c.resolution == resolution))
+    stmt = stmt.where(table.c.city.in_(cities))
+    if start is not None:
+        stmt = stmt.where(date_column >= start)
+    if end is not None:
+        stmt = stmt.where(date_column < end)
+    return stmt
+
+def _read_comparison_frame(cities: List[str], db: Session, start: Optional[datetime],
+                           end: Optional[datetime], resolution: str) -> pd.DataFrame:
+    stmt = _comparison_query(cities, resolution, start, end, db.get_bind().dialect.name)
+    frame = pd.read_sql(stmt, db.connection(), dtype={'aqi': 'float32'})
+
+    missing = sorted(set(cities) - set(frame['city']))
+    if missing and start is None and end is None:
+        table = AirQualityRecord.__table__
+        with_readings = set(db.execute(
+            select(table.c.city).where(table.c.city.in_(missing))
+            .where(table.c.is_prediction == 0).distinct()
+        ).scalars())
+        unseeded = [city for city in missing if city not in with_readings]
+        if unseeded:
+            store_historical_data(unseeded, db)
+        if with_readings and resolution != 'raw':
+            # Readings stored before rollups existed
+            update_rollups(db, sorted(with_readings))
+        frame = pd.read_sql(stmt, db.connection(), dtype={'aqi': 'float32'})
+
+    frame['date'] = pd.to_datetime(frame['date'])
+    wide = frame.pivot(index='date', columns='city', values='aqi')
+    wide = wide.reindex(columns=cities).astype('float32')
+    wide.columns.name = None
+    return wide
+
+def get_comparison_data(cities: Sequence[str], db: Session, start: Optional[datetime] = None,
+                        end: Optional[datetime] = None, resolution: str = 'raw',
+                        use_cache: bool = True) -> pd.DataFrame:
+    """Return AQI for many cities as one wide float32 frame, one column per city.
+
+    Every city is read with a single grouped ``IN`` query. Rows are days
+    (raw readings are averaged per city and calendar day in SQL) or, for
+    'day', 'week' and 'month', the rollup periods. Cities without history
+    are generated first, as in get_historical_data, and stay as all-NaN
+    columns when a date range excludes their data. Frames are cached in
+    ``history_cache`` like get_historical_data's and shared with it.
+    """
+    cities = list(dict.fromkeys(cities))
+    if not cities:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name='date'), dtype='float32')
+
+    key = (tuple(cities), start, end, None, f"compare-{resolution}")
+    if use_cache:
+        cached = history_cache.get(key)
+        if cached is not None:
+            metrics.increment('history_cache_hits')
+            return cached
+        metrics.increment('history_cache_misses')
+
+    with metrics.span('history.compare', resolution=resolution):
+        wide = _read_comparison_frame(cities, db, start, end, resolution)
+
+    if use_cache:
+        history_cache.put(key, wide)
+    return wide
 
 def get_cities() -> List[str]:
     """Return a list of major Indian cities grouped by region"""
@@ -1,19 +1,121 @@
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, Float, String, DateTime
+from sqlalchemy import create_engine, event, insert, Column, Integer, Float, String, DateTime, Index, Table
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import QueuePool
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+import io
 import os
+import threading
 from dotenv import load_dotenv
+from . import metrics
 load_dotenv()
 
+# Embedded database used when DATABASE_URL is not set (single-node and edge deployments)
+DEFAULT_DATABASE_URL = 'sqlite:///vayucheck.db'
+
 # Get database URL from environment
-DATABASE_URL = os.getenv('DATABASE_URL')
+DATABASE_URL = os.getenv('DATABASE_URL') or DEFAULT_DATABASE_URL
 if DATABASE_URL.startswith('postgres://'):
     DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
 
-# Create engine and session
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def _env_flag(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ('1', 'true', 'yes', 'on')
+
+def engine_options(url: str) -> Dict:
+    """Return create_engine keyword arguments tuned from environment variables.
+
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT (seconds), DB_POOL_RECYCLE
+    (seconds), DB_POOL_PRE_PING and DB_STATEMENT_TIMEOUT_MS (PostgreSQL only)
+    tune the connection pool.
+    """
+    backend = make_url(url).get_backend_name()
+    options: Dict = {'pool_pre_ping': _env_flag('DB_POOL_PRE_PING', True)}
+    if backend != 'sqlite':
+        options.update(
+            poolclass=QueuePool,
+            pool_size=int(os.getenv('DB_POOL_SIZE', '10')),
+            max_overflow=int(os.getenv('DB_MAX_OVERFLOW', '20')),
+            pool_timeout=float(os.getenv('DB_POOL_TIMEOUT', '10')),
+            pool_recycle=int(os.getenv('DB_POOL_RECYCLE', '1800')),
+        )
+    statement_timeout = os.getenv('DB_STATEMENT_TIMEOUT_MS')
+    if backend == 'postgresql' and statement_timeout:
+        options['connect_args'] = {'options': f"-c statement_timeout={int(statement_timeout)}"}
+    if backend == 'sqlite':
+        # Pooled connections move between Streamlit and writer threads
+        options['connect_args'] = {'check_same_thread': False}
+    return options
+
+def _sqlite_pragmas() -> Dict[str, str]:
+    """Return the per-connection SQLite pragmas.
+
+    WAL lets readers run alongside the background writer, and
+    synchronous=NORMAL is durable in WAL mode without an fsync per commit.
+    SQLITE_MMAP_SIZE and SQLITE_CACHE_KB size the memory map and page cache.
+    """
+    return {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)),
+        'cache_size': str(-int(os.getenv('SQLITE_CACHE_KB', '65536'))),
+        'temp_store': 'MEMORY',
+        'busy_timeout': os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'),
+    }
+
+def _configure_sqlite_connection(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in _sqlite_pragmas().items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+# Engine and session factory are created on first use, not at import
+_engine: Optional[Engine] = None
+_session_factory: Optional[sessionmaker] = None
+_init_lock = threading.Lock()
+
+def get_engine() -> Engine:
+    """Return the shared engine, creating it on first use.
+
+    Tables are created by ``python migrate.py upgrade``; set DB_AUTO_CREATE
+    to also create missing tables when the engine is first built.
+    """
+    global _engine
+    if _engine is None:
+        with _init_lock:
+            if _engine is None:
+                engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+                if engine.dialect.name == 'sqlite':
+                    event.listen(engine, 'connect', _configure_sqlite_connection)
+                if _env_flag('DB_AUTO_CREATE', False):
+                    Base.metadata.create_all(bind=engine)
+                if metrics.is_enabled():
+                    metrics.instrument_engine(engine)
+                metrics.register_collector('aqi_db_pool', pool_stats)
+                _engine = engine
+    return _engine
+
+def get_session_factory() -> sessionmaker:
+    """Return the shared session factory bound to the engine"""
+    global _session_factory
+    if _session_factory is None:
+        engine = get_engine()
+        with _init_lock:
+            if _session_factory is None:
+                _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return _session_factory
+
+def __getattr__(name: str):
+    # Keeps `from utils.database import engine, SessionLocal` working lazily
+    if name == 'engine':
+        return get_engine()
+    if name == 'SessionLocal':
+        return get_session_factory()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Create base class for models
 Base = declarative_base()
@@ -31,18 +133,141 @@ class AirQualityRecord(Base):
     wind_speed = Column(Float)
     is_prediction = Column(Integer, default=0)  # 0 for historical, 1 for prediction
 
+    # Every hot query filters on city and is_prediction and orders by date
+    __table_args__ = (
+        Index('ix_air_quality_records_city_prediction_date', 'city', 'is_prediction', 'date'),
+    )
+    # Identity matches the (id, date) primary key of the monthly partitioned
+    # table (migrate.py partition); the DDL keeps a plain id key elsewhere
+    __mapper_args__ = {'primary_key': [id, date]}
+
     @classmethod
     def create_tables(cls):
         """Create all database tables"""
-        Base.metadata.create_all(bind=engine)
+        Base.metadata.create_all(bind=get_engine())
+
+class AQIRollup(Base):
+    """Model for pre-aggregated AQI statistics per city and time period"""
+    __tablename__ = "aqi_rollups"
+
+    id = Column(Integer, primary_key=True)
+    city = Column(String, nullable=False)
+    resolution = Column(String, nullable=False)  # 'day', 'week' or 'month'
+    period_start = Column(DateTime, nullable=False)
+    readings = Column(Integer)
+    aqi_min = Column(Float)
+    aqi_mean = Column(Float)
+    aqi_max = Column(Float)
+    aqi_p95 = Column(Float)
+    temperature_mean = Column(Float)
+    humidity_mean = Column(Float)
+    wind_speed_mean = Column(Float)
+
+    __table_args__ = (
+        Index('ix_aqi_rollups_city_resolution_period', 'city', 'resolution', 'period_start', unique=True),
+    )
+
+class CompactionWatermark(Base):
+    """Per-city boundary before which raw readings were compacted into rollups"""
+    __tablename__ = "aqi_compaction_watermarks"
+
+    city = Column(String, primary_key=True)
+    # Rollups of periods starting before this are final and never rebuilt
+    compacted_before = Column(DateTime, nullable=False)
+
+class AQIForecast(Base):
+    """Model for precomputed multi-day AQI forecasts"""
+    __tablename__ = "aqi_forecasts"
+
+    id = Column(Integer, primary_key=True)
+    city = Column(String, nullable=False)
+    issued_at = Column(DateTime, nullable=False)
+    target_date = Column(DateTime, nullable=False)
+    horizon_days = Column(Integer, nullable=False)
+    aqi = Column(Float)
+    temperature = Column(Float)
+    humidity = Column(Float)
+    wind_speed = Column(Float)
+
+    __table_args__ = (
+        Index('ix_aqi_forecasts_city_target_date', 'city', 'target_date'),
+    )
 
 def get_db():
     """Get database session"""
-    db = SessionLocal()
+    db = get_session_factory()()
     try:
         yield db
     finally:
         db.close()
 
-# Create tables
-AirQualityRecord.create_tables()
+@contextmanager
+def session_scope() -> Iterator[Session]:
+    """Provide a short-lived session that is rolled back on error and always closed"""
+    db = get_session_factory()()
+    try:
+        yield db
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def pool_stats() -> Dict:
+    """Return connection pool utilization for the shared engine"""
+    pool = get_engine().pool
+    if not isinstance(pool, QueuePool):
+        return {'pool': type(pool).__name__}
+    checked_out = pool.checkedout()
+    capacity = pool.size() + pool._max_overflow
+    return {
+        'pool': type(pool).__name__,
+        'size': pool.size(),
+        'checked_in': pool.checkedin(),
+        'checked_out': checked_out,
+        'overflow': max(pool.overflow(), 0),
+        'capacity': capacity,
+        'utilization': checked_out / capacity if capacity else 0.0,
+    }
+
+RECORD_COLUMNS = ['city', 'date', 'aqi', 'temperature', 'humidity', 'wind_speed', 'is_prediction']
+
+def bulk_insert_records(db: Session, records: List[Dict]) -> None:
+    """Insert many air quality rows with a single executemany statement"""
+    if not records:
+        return
+    with metrics.span('db.bulk_insert'):
+        db.execute(insert(AirQualityRecord), records)
+        db.commit()
+    metrics.increment('records_inserted', len(records))
+
+def copy_records(db: Session, frame, table: Optional[Table] = None, commit: bool = True) -> int:
+    """Bulk load a DataFrame of air quality rows.
+
+    Uses ``COPY ... FROM STDIN`` on PostgreSQL (psycopg2) and a single
+    executemany insert on every other backend. ``table`` defaults to
+    air_quality_records. Returns the number of rows.
+    """
+    if frame.empty:
+        return 0
+    if table is None:
+        table = AirQualityRecord.__table__
+    frame = frame[RECORD_COLUMNS]
+    connection = db.connection()
+    if connection.dialect.name == 'postgresql' and connection.dialect.driver == 'psycopg2':
+        buffer = io.StringIO()
+        frame.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cursor = connection.connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(RECORD_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+        finally:
+            cursor.close()
+    else:
+        db.execute(insert(table), frame.to_dict('records'))
+    if commit:
+        db.commit()
+    return len(frame)
@@ -0,0 +1,77 @@
+import numpy as np
+
+
+def _as_float(values) -> np.ndarray:
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        values = values.astype('datetime64[ns]').astype(np.int64)
+    return values.astype(np.float64)
+
+
+def lttb_indices(x, y, n_out: int) -> np.ndarray:
+    """Return the indices kept by Largest-Triangle-Three-Buckets downsampling.
+
+    ``x`` must be sorted. The first and last points are always kept and each
+    of the ``n_out - 2`` interior buckets contributes the point forming the
+    largest triangle with the previously kept point and the next bucket's mean.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = _as_float(x)
+    y = _as_float(y)
+
+    bounds = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts, ends = bounds[:-1], bounds[1:]
+    counts = ends - starts
+    mean_x = np.add.reduceat(x[1:n - 1], starts - 1) / counts
+    mean_y = np.add.reduceat(y[1:n - 1], starts - 1) / counts
+    # The bucket after the last interior one is the final point itself
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket, (start, end) in enumerate(zip(starts, ends)):
+        bx = x[start:end]
+        by = y[start:end]
+        area = np.abs((x[previous] - next_x[bucket]) * (by - y[previous])
+                      - (x[previous] - bx) * (next_y[bucket] - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def _first_match_per_bucket(mask: np.ndarray, bucket_of: np.ndarray) -> np.ndarray:
+    positions = np.flatnonzero(mask)
+    _, first = np.unique(bucket_of[positions], return_index=True)
+    return positions[first]
+
+
+def minmax_indices(y, n_out: int) -> np.ndarray:
+    """Return the first and last points plus each bucket's minimum and maximum"""
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    y = _as_float(y)
+
+    starts = np.linspace(0, n, (n_out - 2) // 2 + 1).astype(np.int64)[:-1]
+    counts = np.diff(np.append(starts, n))
+    bucket_of = np.repeat(np.arange(len(starts)), counts)
+    minima = np.repeat(np.minimum.reduceat(y, starts), counts)
+    maxima = np.repeat(np.maximum.reduceat(y, starts), counts)
+    return np.unique(np.concatenate((
+        [0, n - 1],
+        _first_match_per_bucket(y == minima, bucket_of),
+        _first_match_per_bucket(y == maxima, bucket_of),
+    )))
+
+
+def downsample_indices(x, y, n_out: int, method: str = 'lttb') -> np.ndarray:
+    """Pick at most ``n_out`` representative points with 'lttb' or 'minmax'"""
+    if method == 'lttb':
+        return lttb_indices(x, y, n_out)
+    if method == 'minmax':
+        return minmax_indices(y, n_out)
+    raise ValueError(f"Unknown downsampling method {method!r}")
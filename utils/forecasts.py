@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from .cities_data import get_all_cities
+from .database import AirQualityRecord, AQIForecast
+from .predictor import AQIPredictor
+
+FORECAST_HORIZONS = range(1, 8)
+# Recent window whose average weather is what forecasts relax towards
+WEATHER_WINDOW_DAYS = 7
+# Days over which the latest day's weather decays towards the window average
+PERSISTENCE_DAYS = 2.0
+# Forecasts issued longer ago than this are flagged as stale
+STALE_AFTER = timedelta(hours=36)
+# Typical Indian conditions, used for cities without recent readings
+DEFAULT_WEATHER = {'temperature': 30.0, 'humidity': 65.0, 'wind_speed': 12.0}
+
+
+WEATHER_COLUMNS = ['temperature', 'humidity', 'wind_speed']
+
+
+def recent_weather(db: Session, cities: Sequence[str], now: datetime,
+                   days: float = WEATHER_WINDOW_DAYS) -> pd.DataFrame:
+    """Return mean temperature, humidity and wind speed per city over the last ``days``.
+
+    One grouped query; cities without readings in the window are missing
+    (NaN) rather than defaulted.
+    """
+    table = AirQualityRecord.__table__
+    stmt = (select(table.c.city,
+                   func.avg(table.c.temperature).label('temperature'),
+                   func.avg(table.c.humidity).label('humidity'),
+                   func.avg(table.c.wind_speed).label('wind_speed'))
+            .where(table.c.is_prediction == 0)
+            .where(table.c.date >= now - timedelta(days=days))
+            .where(table.c.city.in_(list(cities)))
+            .group_by(table.c.city))
+    weather = pd.read_sql(stmt, db.connection()).set_index('city')
+    return weather.reindex(list(cities))[WEATHER_COLUMNS].astype('float64')
+
+
+def horizon_weather(db: Session, cities: Sequence[str], horizons: np.ndarray,
+                    now: datetime) -> pd.DataFrame:
+    """Return expected weather per city and horizon by damped persistence.
+
+    Day ``h`` starts from the mean of the last 24 hours and relaxes towards
+    the WEATHER_WINDOW_DAYS mean as ``1 - exp(-h / PERSISTENCE_DAYS)``, so
+    near days follow current conditions and later ones the recent average.
+    Cities without recent readings use DEFAULT_WEATHER for every day.
+    """
+    baseline = recent_weather(db, cities, now).fillna(DEFAULT_WEATHER)
+    latest = recent_weather(db, cities, now, days=1).fillna(baseline)
+    # Rows are city-major: every horizon of the first city, then the next city
+    weight = np.tile(1.0 - np.exp(-horizons / PERSISTENCE_DAYS), len(cities))[:, None]
+    latest_values = np.repeat(latest.to_numpy(dtype=np.float64), len(horizons), axis=0)
+    baseline_values = np.repeat(baseline.to_numpy(dtype=np.float64), len(horizons), axis=0)
+    return pd.DataFrame(latest_values + (baseline_values - latest_values) * weight, columns=WEATHER_COLUMNS)
+
+
+def compute_forecasts(db: Session, cities: Optional[Sequence[str]] = None,
+                      predictor: Optional[AQIPredictor] = None,
+                      now: Optional[datetime] = None) -> pd.DataFrame:
+    """Forecast AQI 1-7 days ahead for every city in one vectorized batch"""
+    cities = sorted(set(cities if cities is not None else get_all_cities()))
+    predictor = predictor if predictor is not None else AQIPredictor()
+    now = now if now is not None else datetime.utcnow()
+    today = datetime(now.year, now.month, now.day)
+
+    horizons = np.array(list(FORECAST_HORIZONS))
+    frame = pd.DataFrame({
+        'city': np.repeat(cities, len(horizons)),
+        'horizon_days': np.tile(horizons, len(cities)),
+    })
+    frame['target_date'] = today + pd.to_timedelta(frame['horizon_days'], unit='D')
+    frame[WEATHER_COLUMNS] = horizon_weather(db, cities, horizons, now)
+    frame['aqi'] = predictor.predict_many(frame, months=frame['target_date'].dt.month.to_numpy(), store=False)
+    frame['issued_at'] = now
+    return frame
+
+
+def store_forecasts(db: Session, frame: pd.DataFrame) -> int:
+    """Replace the stored forecasts of the cities in ``frame`` with a new issuance"""
+    if frame.empty:
+        return 0
+    columns = ['city', 'issued_at', 'target_date', 'horizon_days', 'aqi',
+               'temperature', 'humidity', 'wind_speed']
+    db.execute(delete(AQIForecast).where(AQIForecast.city.in_(frame['city'].unique().tolist())))
+    db.execute(insert(AQIForecast), frame[columns].to_dict('records'))
+    db.commit()
+    return len(frame)
+
+
+def run_forecast_job(db: Session, cities: Optional[Sequence[str]] = None) -> int:
+    """Compute and store forecasts for all (or the given) cities"""
+    return store_forecasts(db, compute_forecasts(db, cities))
+
+
+def get_forecast(city: str, db: Session, now: Optional[datetime] = None) -> pd.DataFrame:
+    """Return the precomputed forecast for a city from today (UTC) on, nearest day first.
+
+    Days already in the past are dropped, so a stale issuance shrinks
+    rather than showing old dates; see forecast_age for how old it is.
+    """
+    now = now if now is not None else datetime.utcnow()
+    today = datetime(now.year, now.month, now.day)
+    table = AQIForecast.__table__
+    stmt = (select(table.c.target_date, table.c.horizon_days, table.c.aqi,
+                   table.c.temperature, table.c.humidity, table.c.wind_speed, table.c.issued_at)
+            .where(table.c.city == city)
+            .where(table.c.target_date >= today)
+            .order_by(table.c.target_date))
+    frame = pd.read_sql(stmt, db.connection())
+    frame['target_date'] = pd.to_datetime(frame['target_date'])
+    frame['issued_at'] = pd.to_datetime(frame['issued_at'])
+    return frame
+
+
+def forecast_age(forecast: pd.DataFrame, now: Optional[datetime] = None) -> Optional[timedelta]:
+    """Return how long ago a forecast from get_forecast was issued, or None if it is empty"""
+    if forecast.empty:
+        return None
+    now = now if now is not None else datetime.utcnow()
+    return now - forecast['issued_at'].max().to_pydatetime()
@@ -0,0 +1,225 @@
+import asyncio
+import json
+import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from . import metrics
+from .batching import MicroBatcher
+from .cities_data import CITY_REGISTRY, CityRegistry
+from .data_generator import get_historical_data
+from .database import session_scope
+from .predictor import AQIPredictor
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 1024 * 1024
+PREDICT_FIELDS = ('temperature', 'humidity', 'wind_speed')
+ROUTES = ('/predict', '/history', '/health', '/metrics')
+JSON_TYPE = 'application/json'
+METRICS_TYPE = 'text/plain; version=0.0.4'
+RESOLUTIONS = ('raw', 'day', 'week', 'month')
+
+_REASONS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    413: 'Payload Too Large', 500: 'Internal Server Error',
+}
+
+
+class RequestError(Exception):
+    """A client error reported back as a JSON ``{"error": ...}`` response"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _check_city(city: str) -> str:
+    if CITY_REGISTRY.city_id(city) == CityRegistry.UNKNOWN:
+        raise RequestError(400, f"unknown city {city!r}")
+    return city
+
+
+def _parse_prediction(item) -> Tuple[str, float, float, float]:
+    if not isinstance(item, dict) or not isinstance(item.get('city'), str):
+        raise RequestError(400, "each prediction needs a 'city' string")
+    _check_city(item['city'])
+    values = []
+    for field in PREDICT_FIELDS:
+        value = item.get(field)
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise RequestError(400, f"'{field}' must be a finite number")
+        values.append(float(value))
+    return (item['city'], *values)
+
+
+def _parse_datetime(params: Dict[str, List[str]], name: str) -> Optional[datetime]:
+    if name not in params:
+        return None
+    try:
+        return datetime.fromisoformat(params[name][0])
+    except ValueError:
+        raise RequestError(400, f"'{name}' must be an ISO date") from None
+
+
+class AQIService:
+    """Asyncio JSON API over AQIPredictor and get_historical_data.
+
+    Routes: ``POST /predict`` (one object or a list of objects with city,
+    temperature, humidity and wind_speed), ``GET /history?city=...`` with
+    optional start, end, limit and resolution, ``GET /health`` and
+    ``GET /metrics`` (Prometheus text, populated when AQI_METRICS is on).
+    Cities must be in CITY_REGISTRY, and history reads never write: a city
+    with no stored readings returns an empty list.
+    Predictions from concurrent requests are coalesced by a MicroBatcher
+    into one ``predict_many`` call and one bulk insert per batch. Database
+    work runs on a thread pool so the event loop never blocks.
+    """
+
+    def __init__(self, predictor: Optional[AQIPredictor] = None, max_batch: int = 1024,
+                 max_delay: float = 0.005, workers: int = 8, store: bool = True):
+        self.predictor = predictor if predictor is not None else AQIPredictor()
+        self.store = store
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='aqi-api')
+        self.batcher = MicroBatcher(self._predict_batch, max_batch=max_batch,
+                                    max_delay=max_delay, executor=self.executor)
+        metrics.register_collector('aqi_api_batcher', self.batcher.stats)
+
+    def _predict_batch(self, items: List[Tuple[str, float, float, float]]) -> List[float]:
+        cities, temperatures, humidities, wind_speeds = zip(*items)
+        if not self.store:
+            return self.predictor.predict_many(cities, temperatures, humidities, wind_speeds,
+                                               store=False).tolist()
+        with session_scope() as db:
+            return self.predictor.predict_many(cities, temperatures, humidities, wind_speeds,
+                                               db=db).tolist()
+
+    async def predict(self, body: bytes):
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            raise RequestError(400, "request body must be JSON") from None
+        items = payload if isinstance(payload, list) else [payload]
+        parsed = [_parse_prediction(item) for item in items]
+        # Each row joins the current batch; a request larger than max_batch spans several
+        values = await asyncio.gather(*(self.batcher.submit(row) for row in parsed))
+        results = []
+        for (city, *_), aqi in zip(parsed, values):
+            level, color = AQIPredictor.get_aqi_level(aqi)
+            results.append({'city': city, 'aqi': round(aqi, 2), 'level': level, 'color': color})
+        return results if isinstance(payload, list) else results[0]
+
+    def _read_history(self, city, start, end, limit, resolution) -> str:
+        with session_scope() as db:
+            frame = get_historical_data(city, db, start=start, end=end, limit=limit,
+                                        resolution=resolution, backfill=False)
+        return frame.to_json(orient='records', date_format='iso')
+
+    async def history(self, query: str) -> str:
+        params = parse_qs(query)
+        if 'city' not in params:
+            raise RequestError(400, "'city' is required")
+        city = _check_city(params['city'][0])
+        resolution = params.get('resolution', ['raw'])[0]
+        if resolution not in RESOLUTIONS:
+            raise RequestError(400, f"'resolution' must be one of {', '.join(RESOLUTIONS)}")
+        try:
+            limit = int(params['limit'][0]) if 'limit' in params else None
+        except ValueError:
+            raise RequestError(400, "'limit' must be an integer") from None
+        if limit is not None and limit <= 0:
+            raise RequestError(400, "'limit' must be greater than 0")
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, self._read_history, city,
+            _parse_datetime(params, 'start'), _parse_datetime(params, 'end'), limit, resolution
+        )
+
+    def health(self) -> Dict:
+        return {'status': 'ok', 'batcher': self.batcher.stats()}
+
+    async def dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, bytes, str]:
+        """Route one request and return (status, body, content type)"""
+        url = urlsplit(target)
+        route = url.path if url.path in ROUTES else 'other'
+        with metrics.span('api.request', route=route):
+            status, body, content_type = await self._route(method, url, body)
+        metrics.increment('api_requests', route=route, status=status)
+        return status, body, content_type
+
+    async def _route(self, method: str, url, body: bytes) -> Tuple[int, bytes, str]:
+        try:
+            if url.path == '/predict':
+                if method != 'POST':
+                    raise RequestError(405, "use POST")
+                result = json.dumps(await self.predict(body))
+            elif url.path == '/history':
+                if method != 'GET':
+                    raise RequestError(405, "use GET")
+                # Already serialized by pandas
+                result = await self.history(url.query)
+            elif url.path == '/health':
+                result = json.dumps(self.health())
+            elif url.path == '/metrics':
+                return 200, metrics.registry.render().encode(), METRICS_TYPE
+            else:
+                raise RequestError(404, f"no route for {url.path}")
+        except RequestError as exc:
+            return exc.status, json.dumps({'error': str(exc)}).encode(), JSON_TYPE
+        except Exception:
+            logger.exception("Error handling %s %s", method, url.geturl())
+            return 500, b'{"error": "internal error"}', JSON_TYPE
+        return 200, result.encode(), JSON_TYPE
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve HTTP/1.1 requests on one connection, keeping it alive between requests"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    status, body, content_type = 413, b'{"error": "request body too large"}', JSON_TYPE
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    status, body, content_type = await self.dispatch(method, target, body)
+                    connection = headers.get('connection', '').lower()
+                    keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' else connection != 'close'
+
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + body
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            # Malformed request line or headers, or the client went away
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8000) -> None:
+        """Run the HTTP server until cancelled"""
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog=1024)
+        logger.info("AQI API listening on %s:%d", host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(wait=True)
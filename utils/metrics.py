@@ -0,0 +1,295 @@
+import bisect
+import contextvars
+import functools
+import hmac
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Latency histogram buckets in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_enabled = os.getenv('AQI_METRICS', '').strip().lower() in ('1', 'true', 'yes', 'on')
+_NOOP = nullcontext()
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def enable(enabled: bool = True) -> None:
+    """Turn instrumentation on or off for this process (AQI_METRICS sets the default)"""
+    global _enabled
+    _enabled = enabled
+
+
+def _labels(labels: Dict) -> LabelSet:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: LabelSet, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"') for _, value in pairs)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+
+class _Histogram:
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """Thread-safe counters, latency histograms and gauge collectors"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, LabelSet], _Histogram] = {}
+        self._counters: Dict[Tuple[str, LabelSet], float] = {}
+        self._collectors: Dict[str, Callable[[], Dict]] = {}
+
+    def observe(self, name: str, seconds: float, labels: LabelSet = ()) -> None:
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = self._histograms[(name, labels)] = _Histogram()
+            histogram.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+            histogram.total += seconds
+            histogram.count += 1
+
+    def increment(self, name: str, amount: float = 1, labels: LabelSet = ()) -> None:
+        with self._lock:
+            self._counters[(name, labels)] = self._counters.get((name, labels), 0) + amount
+
+    def register_collector(self, prefix: str, collect: Callable[[], Dict]) -> None:
+        """Export the numeric values of ``collect()`` as ``<prefix>_<key>`` gauges"""
+        with self._lock:
+            self._collectors[prefix] = collect
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format"""
+        with self._lock:
+            histograms = {key: (list(h.counts), h.total, h.count) for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+            collectors = dict(self._collectors)
+
+        lines: List[str] = []
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# TYPE {name} histogram")
+            for (metric, labels), (counts, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(BUCKETS, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', repr(bound)))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE {name}_total counter")
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}_total{_format_labels(labels)} {value}")
+        for prefix, collect in sorted(collectors.items()):
+            try:
+                values = collect()
+            except Exception:
+                continue
+            for key, value in sorted(values.items()):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f"# TYPE {prefix}_{key} gauge")
+                    lines.append(f"{prefix}_{key} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class Trace:
+    """Spans recorded during one unit of work, such as a Streamlit rerun"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Tuple[str, float]] = []
+
+    def add(self, name: str, seconds: float) -> None:
+        self.spans.append((name, seconds))
+
+    def summary(self) -> List[Dict]:
+        """Return calls and total milliseconds per span name, slowest first"""
+        totals: Dict[str, List[float]] = {}
+        for name, seconds in self.spans:
+            entry = totals.setdefault(name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+        return sorted(
+            ({'span': name, 'calls': calls, 'total_ms': round(seconds * 1000, 2)}
+             for name, (calls, seconds) in totals.items()),
+            key=lambda row: -row['total_ms']
+        )
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar('aqi_trace', default=None)
+
+
+def start_trace() -> Trace:
+    """Collect the spans recorded from here on in this thread or task"""
+    trace = Trace()
+    _current_trace.set(trace)
+    return trace
+
+
+def end_trace() -> None:
+    _current_trace.set(None)
+
+
+def _record(name: str, labels: LabelSet, seconds: float) -> None:
+    registry.observe(f"aqi_{name.split('.')[0]}_seconds", seconds, (('span', name),) + labels)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+class _Span:
+    __slots__ = ('name', 'labels', 'started')
+
+    def __init__(self, name: str, labels: LabelSet):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        _record(self.name, self.labels, time.perf_counter() - self.started)
+        return False
+
+
+def span(name: str, **labels):
+    """Time a block as ``name``; a shared no-op context when metrics are off.
+
+    Spans are exported as the ``aqi_<first name part>_seconds`` histogram
+    with a ``span`` label and added to the current trace, if any.
+    """
+    if not _enabled:
+        return _NOOP
+    return _Span(name, _labels(labels))
+
+
+def timed(name: str):
+    """Decorator form of ``span``"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(name, ()):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def increment(name: str, amount: float = 1, **labels) -> None:
+    """Add to the ``aqi_<name>_total`` counter when metrics are on"""
+    if _enabled:
+        registry.increment(f"aqi_{name}", amount, _labels(labels))
+
+
+def register_collector(prefix: str, collect: Callable[[], Dict]) -> None:
+    registry.register_collector(prefix, collect)
+
+
+def admin_allowed(token: Optional[str]) -> bool:
+    """Return True if ``token`` matches AQI_ADMIN_TOKEN"""
+    expected = os.getenv('AQI_ADMIN_TOKEN')
+    return bool(expected and token) and hmac.compare_digest(expected, token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the per-statement context, so a failed statement leaves nothing behind
+    if context is not None:
+        context._aqi_query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_aqi_query_started', None)
+    if started is None:
+        return
+    # The leading keyword keeps label cardinality bounded
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'OTHER'
+    _record(f"sql.{verb.lower()}", (), time.perf_counter() - started)
+
+
+def instrument_engine(engine) -> None:
+    """Time every SQL statement run through ``engine``"""
+    from sqlalchemy import event
+
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+_server: Optional[threading.Thread] = None
+# Set when binding failed, so Streamlit reruns do not retry and log again
+_server_error: Optional[OSError] = None
+_server_lock = threading.Lock()
+
+
+def start_http_server(port: int, host: str = '0.0.0.0') -> bool:
+    """Serve ``/metrics`` from a daemon thread and return whether it is serving.
+
+    Only the first call binds the port; later calls are no-ops. A bind
+    failure (such as the port already being in use) is logged once and
+    remembered, and never raised.
+    """
+    global _server, _server_error
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    with _server_lock:
+        if _server is not None or _server_error is not None:
+            return _server is not None
+        try:
+            server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as exc:
+            _server_error = exc
+            logger.error("Metrics endpoint not started on %s:%d: %s", host, port, exc)
+            return False
+        _server = threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True)
+        _server.start()
+        return True
+
+
+def serve_from_env() -> None:
+    """Start the metrics endpoint when metrics are on and AQI_METRICS_PORT is set"""
+    port = os.getenv('AQI_METRICS_PORT')
+    if _enabled and port:
+        start_http_server(int(port))
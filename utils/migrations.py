@@ -0,0 +1,187 @@
+from datetime import date
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from .database import AirQualityRecord, Base
+
+TABLE = AirQualityRecord.__tablename__
+COMPOSITE_INDEX = 'ix_air_quality_records_city_prediction_date'
+DEFAULT_PARTITION = f"{TABLE}_default"
+RECORD_COLUMNS = 'id, city, date, aqi, temperature, humidity, wind_speed, is_prediction'
+
+
+def _month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _add_months(value: date, months: int) -> date:
+    month = value.month - 1 + months
+    return date(value.year + month // 12, month % 12 + 1, 1)
+
+
+def _partition_name(month: date) -> str:
+    return f"{TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def create_tables(engine: Engine) -> None:
+    """Create any missing tables and indexes"""
+    Base.metadata.create_all(bind=engine)
+
+
+def create_composite_index(engine: Engine) -> None:
+    """Add the (city, is_prediction, date) index to an existing table"""
+    if engine.dialect.name == 'postgresql' and not is_partitioned(engine):
+        # CONCURRENTLY avoids locking writes but cannot run inside a transaction
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {COMPOSITE_INDEX} "
+                f"ON {TABLE} (city, is_prediction, date)"
+            ))
+    else:
+        with engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {COMPOSITE_INDEX} "
+                f"ON {TABLE} (city, is_prediction, date)"
+            ))
+
+
+def is_partitioned(engine: Engine) -> bool:
+    """Return True if the records table is a PostgreSQL partitioned table"""
+    if engine.dialect.name != 'postgresql':
+        return False
+    with engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+            "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :table)"
+        ), {'table': TABLE}).scalar()
+
+
+def _relation_exists(conn, name: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {'name': name}).scalar()
+
+
+def _create_month_partitions(conn, first: date, last: date) -> List[str]:
+    """Create the missing monthly partitions in the caller's transaction.
+
+    PostgreSQL refuses to create a partition while the default partition
+    holds rows in its range, so those rows are moved into a standalone
+    table that is then attached as the partition. The default partition is
+    locked first, so no new row can land in the range in between.
+    """
+    has_default = _relation_exists(conn, DEFAULT_PARTITION)
+    created = []
+    month = _month_start(first)
+    while month <= last:
+        name = _partition_name(month)
+        start, end = month.isoformat(), _add_months(month, 1).isoformat()
+        if not _relation_exists(conn, name):
+            in_range = f"date >= '{start}' AND date < '{end}'"
+            stranded = False
+            if has_default:
+                conn.execute(text(f"LOCK TABLE {DEFAULT_PARTITION} IN EXCLUSIVE MODE"))
+                stranded = conn.execute(text(
+                    f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_range})"
+                )).scalar()
+            if stranded:
+                conn.execute(text(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)"))
+                conn.execute(text(
+                    f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {in_range} RETURNING {RECORD_COLUMNS}) "
+                    f"INSERT INTO {name} ({RECORD_COLUMNS}) SELECT {RECORD_COLUMNS} FROM moved"
+                ))
+                # Also builds the parent's indexes on the new partition
+                conn.execute(text(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')"))
+            else:
+                conn.execute(text(f"CREATE TABLE {name} PARTITION OF {TABLE} FOR VALUES FROM ('{start}') TO ('{end}')"))
+        created.append(name)
+        month = _add_months(month, 1)
+    return created
+
+
+def ensure_monthly_partitions(engine: Engine, months_ahead: int = 3) -> List[str]:
+    """Create partitions from the current month up to ``months_ahead`` months out.
+
+    Rows already in the default partition for a new month are moved into it,
+    in the same transaction.
+    """
+    if not is_partitioned(engine):
+        return []
+    today = date.today()
+    with engine.begin() as conn:
+        return _create_month_partitions(conn, today, _add_months(_month_start(today), months_ahead))
+
+
+def partition_by_month(engine: Engine, months_ahead: int = 3) -> List[str]:
+    """Convert the records table in place into a monthly range-partitioned table.
+
+    Runs in a single transaction: the existing rows are copied into a new
+    partitioned table that reuses the id sequence, the old table is dropped
+    and the new one takes its name. Rows outside every monthly range land in
+    a default partition. PostgreSQL only.
+    """
+    if engine.dialect.name != 'postgresql':
+        raise RuntimeError("Range partitioning is only supported on PostgreSQL")
+    if is_partitioned(engine):
+        return ensure_monthly_partitions(engine, months_ahead)
+
+    with engine.begin() as conn:
+        conn.execute(text(f"LOCK TABLE {TABLE} IN EXCLUSIVE MODE"))
+        oldest = conn.execute(text(f"SELECT min(date) FROM {TABLE}")).scalar()
+        first = oldest.date() if oldest is not None else date.today()
+        last = _add_months(_month_start(date.today()), months_ahead)
+
+        conn.execute(text(f"ALTER SEQUENCE {TABLE}_id_seq OWNED BY NONE"))
+        conn.execute(text(
+            f"CREATE TABLE {TABLE}_new ("
+            f"id integer NOT NULL DEFAULT nextval('{TABLE}_id_seq'), "
+            "city varchar, date timestamp without time zone NOT NULL, aqi double precision, "
+            "temperature double precision, humidity double precision, "
+            "wind_speed double precision, is_prediction integer, "
+            "PRIMARY KEY (id, date)"
+            ") PARTITION BY RANGE (date)"
+        ))
+        conn.execute(text(f"ALTER TABLE {TABLE} RENAME TO {TABLE}_old"))
+        conn.execute(text(f"ALTER TABLE {TABLE}_new RENAME TO {TABLE}"))
+        conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"))
+        created = _create_month_partitions(conn, first, last)
+
+        conn.execute(text(
+            f"INSERT INTO {TABLE} ({RECORD_COLUMNS}) "
+            f"SELECT id, city, coalesce(date, now()), aqi, temperature, humidity, wind_speed, is_prediction "
+            f"FROM {TABLE}_old"
+        ))
+        conn.execute(text(f"DROP TABLE {TABLE}_old"))
+        conn.execute(text(f"ALTER SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id"))
+
+        conn.execute(text(f"CREATE INDEX ix_{TABLE}_id ON {TABLE} (id)"))
+        conn.execute(text(f"CREATE INDEX ix_{TABLE}_city ON {TABLE} (city)"))
+        conn.execute(text(f"CREATE INDEX {COMPOSITE_INDEX} ON {TABLE} (city, is_prediction, date)"))
+    return created
+
+
+def partitions_before(engine: Engine, cutoff: date) -> List[str]:
+    """Return the monthly partitions whose whole range ends on or before ``cutoff``"""
+    if not is_partitioned(engine):
+        return []
+    with engine.connect() as conn:
+        names = conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = :table"
+        ), {'table': TABLE}).scalars().all()
+    expired = []
+    for name in names:
+        suffix = name[len(TABLE) + 1:]
+        # Monthly partitions are named <table>_yYYYYmMM; the default partition is skipped
+        if len(suffix) == 8 and suffix[0] == 'y' and suffix[5] == 'm' and suffix[1:5].isdigit() and suffix[6:].isdigit():
+            month = date(int(suffix[1:5]), int(suffix[6:]), 1)
+            if _add_months(month, 1) <= cutoff:
+                expired.append(name)
+    return sorted(expired)
+
+
+def drop_partition(conn: Connection, name: str) -> None:
+    """Detach and drop one partition in the caller's transaction, freeing its rows without a DELETE"""
+    conn.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+    conn.execute(text(f"DROP TABLE {name}"))
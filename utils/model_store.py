@@ -0,0 +1,203 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+MODEL_DIR = os.getenv('AQI_MODEL_DIR', 'models')
+BUNDLED_MODEL_PATH = os.getenv('AQI_MODEL_PATH', 'aqi_model.pkl')
+CURRENT_POINTER = 'CURRENT'
+
+# Inputs train_model.py fits on, in this order
+FEATURE_COLUMNS = ['temperature', 'humidity', 'wind_speed', 'city_factor', 'season_factor']
+# Every input predictor.build_features can produce; a served model may use any of them, in any order
+SUPPORTED_FEATURES = FEATURE_COLUMNS + ['region_factor', 'size_factor']
+
+
+def write_atomic(path: str, write) -> None:
+    """Write a file through a temporary sibling and rename it into place"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            write(handle)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    """A deserialized model together with the version and feature layout it was loaded from"""
+    version: str
+    path: str
+    model: Any
+    # Input columns in the order the model expects them, or None if unknown
+    features: Optional[Tuple[str, ...]] = None
+
+
+class ModelStore:
+    """Loads the active AQI model lazily, once per process, and hot-swaps it.
+
+    Published versions live in ``model_dir`` as ``<version>.joblib`` and the
+    ``CURRENT`` file names the active one. Both are replaced atomically with
+    ``os.replace``, so readers always see a complete artifact. Without a
+    published version the bundled model is served.
+
+    Each artifact has a ``.json`` sidecar recording the features it was
+    fitted on, in order; the bundled model's (aqi_model.json) was written by
+    hand because the model predates feature names. When
+    ``supported_features`` is set, artifacts whose sidecar names any other
+    feature, and the bundled model without a sidecar, are never unpickled.
+
+    ``mmap_mode`` is passed to joblib.load. It only shares pages between
+    processes for models whose fitted state is plain numpy arrays saved
+    uncompressed by joblib; tree ensembles such as the bundled random forest
+    copy their nodes on load either way, so it is off by default.
+    """
+
+    def __init__(self, model_dir: str = MODEL_DIR, bundled_path: str = BUNDLED_MODEL_PATH,
+                 check_interval: float = 30.0, mmap_mode: Optional[str] = None,
+                 supported_features: Optional[Sequence[str]] = SUPPORTED_FEATURES):
+        self.model_dir = model_dir
+        self.bundled_path = bundled_path
+        self.check_interval = check_interval
+        self.mmap_mode = mmap_mode
+        self.supported_features = list(supported_features) if supported_features is not None else None
+        self._loaded: Optional[LoadedModel] = None
+        self._rejected_path: Optional[str] = None
+        self._pointer_mtime: Optional[int] = None
+        self._checked_at = float('-inf')
+        self._lock = threading.Lock()
+
+    @property
+    def pointer_path(self) -> str:
+        return os.path.join(self.model_dir, CURRENT_POINTER)
+
+    def artifact_path(self, version: str) -> str:
+        return os.path.join(self.model_dir, f"{version}.joblib")
+
+    @staticmethod
+    def metadata_path(artifact_path: str) -> str:
+        return f"{os.path.splitext(artifact_path)[0]}.json"
+
+    def read_metadata(self, artifact_path: str) -> Optional[dict]:
+        """Return an artifact's sidecar metadata, or None if it has none"""
+        try:
+            with open(self.metadata_path(artifact_path)) as handle:
+                return json.load(handle)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def get(self) -> Optional[LoadedModel]:
+        """Return the active model, loading or swapping it if needed"""
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return self._loaded
+        with self._lock:
+            if time.monotonic() - self._checked_at >= self.check_interval:
+                self._refresh()
+                self._checked_at = time.monotonic()
+            return self._loaded
+
+    def reload(self) -> Optional[LoadedModel]:
+        """Re-read the version pointer immediately"""
+        with self._lock:
+            self._pointer_mtime = None
+            self._refresh()
+            self._checked_at = time.monotonic()
+            return self._loaded
+
+    def publish(self, model: Any, version: str, activate: bool = True) -> str:
+        """Store a new model version and optionally make it the active one"""
+        import joblib
+        os.makedirs(self.model_dir, exist_ok=True)
+        path = self.artifact_path(version)
+        # Uncompressed so the arrays can be memory-mapped on load
+        write_atomic(path, lambda handle: joblib.dump(model, handle, compress=0))
+        features = getattr(model, 'feature_names_in_', None)
+        metadata = {'version': version, 'features': list(features) if features is not None else None}
+        write_atomic(self.metadata_path(path), lambda handle: handle.write(json.dumps(metadata).encode()))
+        if activate:
+            self.activate(version)
+        return path
+
+    def activate(self, version: str) -> None:
+        """Point CURRENT at an already published version"""
+        if not os.path.exists(self.artifact_path(version)):
+            raise FileNotFoundError(self.artifact_path(version))
+        write_atomic(self.pointer_path, lambda handle: handle.write(version.encode()))
+
+    def _refresh(self) -> None:
+        try:
+            mtime = os.stat(self.pointer_path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+
+        if self._loaded is not None and mtime == self._pointer_mtime:
+            return
+
+        if mtime is None:
+            version, path = 'bundled', self.bundled_path
+        else:
+            with open(self.pointer_path) as handle:
+                version = handle.read().strip()
+            path = self.artifact_path(version)
+
+        if self._loaded is not None and self._loaded.path == path:
+            self._pointer_mtime = mtime
+            return
+        if not self._compatible(version, path):
+            # Keep serving the previous model (or none); the predictor falls back to the formula
+            self._pointer_mtime = mtime
+            return
+
+        # joblib (and the estimator's libraries) are only imported once a model is needed
+        import joblib
+        try:
+            model = joblib.load(path, mmap_mode=self.mmap_mode)
+        except Exception:
+            # Keep serving the previous model (or none) if the new one is unreadable
+            logger.exception("Could not load AQI model %s from %s", version, path)
+            return
+        metadata = self.read_metadata(path) or {}
+        features = metadata.get('features') or getattr(model, 'feature_names_in_', None)
+        self._loaded = LoadedModel(version=version, path=path, model=model,
+                                   features=tuple(features) if features is not None else None)
+        self._pointer_mtime = mtime
+        logger.info("Serving AQI model %s from %s", version, path)
+
+    def _compatible(self, version: str, path: str) -> bool:
+        """Check an artifact's recorded features without unpickling it"""
+        if self.supported_features is None:
+            return True
+        metadata = self.read_metadata(path)
+        if metadata is None:
+            # Published versions from before sidecars are checked after loading instead
+            compatible = path != self.bundled_path
+        else:
+            features = metadata.get('features')
+            compatible = bool(features) and set(features) <= set(self.supported_features)
+        if not compatible and self._rejected_path != path:
+            self._rejected_path = path
+            logger.info("Not loading AQI model %s from %s: its features are not a subset of %s",
+                        version, path, self.supported_features)
+        return compatible
+
+
+_store: Optional[ModelStore] = None
+_store_lock = threading.Lock()
+
+
+def get_model_store() -> ModelStore:
+    """Return the process-wide model store"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ModelStore()
+        return _store
@@ -0,0 +1,174 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from . import metrics
+from .database import bulk_insert_records, get_session_factory
+
+logger = logging.getLogger(__name__)
+
+# Seconds close() waits for the final flush, including at interpreter exit
+CLOSE_TIMEOUT = 10.0
+
+
+class PredictionWriter:
+    """Background writer that stores prediction records in batches.
+
+    Records are put on a bounded queue and flushed by a daemon thread once
+    ``batch_size`` records are waiting or ``flush_interval`` seconds have
+    passed since the first record of the batch arrived. When the queue is
+    full, ``submit`` returns False instead of blocking the caller. A failed
+    flush is retried ``max_retries`` times before its records are dropped
+    and counted as ``failed_rows``.
+    """
+
+    def __init__(self, session_factory=None, max_queue: int = 10000,
+                 batch_size: int = 500, flush_interval: float = 1.0,
+                 max_retries: int = 2, retry_delay: float = 0.5):
+        self.session_factory = session_factory if session_factory is not None else get_session_factory()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._queue: "queue.Queue[Dict]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        # Orders submits against close() so nothing is queued after the final drain
+        self._submit_lock = threading.Lock()
+        self._counters = {
+            'accepted': 0,
+            'rejected': 0,
+            'flushed_rows': 0,
+            'flush_count': 0,
+            'failed_flushes': 0,
+            'failed_rows': 0,
+            'last_flush_seconds': 0.0,
+            'max_flush_seconds': 0.0,
+            'total_flush_seconds': 0.0,
+        }
+        self._thread = threading.Thread(target=self._run, name="prediction-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, record: Dict, timeout: Optional[float] = None) -> bool:
+        """Queue one record; return False if the queue stayed full"""
+        with self._submit_lock:
+            if self._stop.is_set():
+                raise RuntimeError("PredictionWriter is closed")
+            try:
+                if timeout is None:
+                    self._queue.put_nowait(record)
+                else:
+                    self._queue.put(record, timeout=timeout)
+            except queue.Full:
+                self._count('rejected')
+                return False
+        self._count('accepted')
+        return True
+
+    def submit_many(self, records: Iterable[Dict], timeout: Optional[float] = None) -> int:
+        """Queue several records; return how many were accepted"""
+        return sum(self.submit(record, timeout=timeout) for record in records)
+
+    def stats(self) -> Dict:
+        """Return queue depth and flush counters"""
+        with self._lock:
+            stats = dict(self._counters)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['queue_capacity'] = self._queue.maxsize
+        return stats
+
+    def close(self, timeout: Optional[float] = CLOSE_TIMEOUT) -> None:
+        """Stop accepting records and flush everything still queued.
+
+        Waits at most ``timeout`` seconds (forever when None) so a stuck
+        flush cannot hang interpreter shutdown; records still queued then
+        are logged as dropped.
+        """
+        with self._submit_lock:
+            self._stop.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning("Prediction writer did not finish within %.1fs; dropping %d queued records",
+                           timeout, self._queue.qsize())
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+    def _next_batch(self) -> List[Dict]:
+        batch: List[Dict] = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            if deadline is None:
+                wait = self.flush_interval
+            else:
+                wait = deadline - time.monotonic()
+                if wait <= 0:
+                    break
+            try:
+                batch.append(self._queue.get(timeout=wait))
+            except queue.Empty:
+                if batch or self._stop.is_set():
+                    break
+                continue
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+        return batch
+
+    def _run(self) -> None:
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch: List[Dict]) -> None:
+        started = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            db = self.session_factory()
+            try:
+                bulk_insert_records(db, batch)
+                break
+            except Exception:
+                db.rollback()
+                self._count('failed_flushes')
+                if attempt == self.max_retries:
+                    self._count('failed_rows', len(batch))
+                    logger.exception("Failed to store %d prediction records after %d attempts; dropping them",
+                                     len(batch), attempt + 1)
+                    return
+                logger.warning("Storing %d prediction records failed, retrying", len(batch), exc_info=True)
+            finally:
+                db.close()
+            time.sleep(self.retry_delay * 2 ** attempt)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._counters['flushed_rows'] += len(batch)
+            self._counters['flush_count'] += 1
+            self._counters['last_flush_seconds'] = elapsed
+            self._counters['total_flush_seconds'] += elapsed
+            self._counters['max_flush_seconds'] = max(self._counters['max_flush_seconds'], elapsed)
+
+
+_writer: Optional[PredictionWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_prediction_writer() -> PredictionWriter:
+    """Return the process-wide prediction writer, starting it on first use"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = PredictionWriter()
+            atexit.register(_writer.close)
+            metrics.register_collector('aqi_prediction_writer', _writer.stats)
+        return _writer
+
+
+def prediction_writer_stats() -> Optional[Dict]:
+    """Return the process-wide writer's stats, or None if it has not been started"""
+    with _writer_lock:
+        writer = _writer
+    return writer.stats() if writer is not None else None
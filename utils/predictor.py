@@ -1,34 +1,59 @@
+import logging
 import numpy as np
-from sklearn.linear_model import LinearRegression
+import pandas as pd
 from datetime import datetime
-from .database import AirQualityRecord
-from .cities_data import get_region_and_state, get_city_size_factor
+from . import metrics
+from .database import bulk_insert_records
+from .cities_data import CITY_REGISTRY
+from .model_store import FEATURE_COLUMNS, SUPPORTED_FEATURES, get_model_store
 
-class AQIPredictor:
-    def __init__(self):
-        self.model = LinearRegression()
-        # City-specific pollution factors
-        self.city_factors = {
-            # North India (generally higher pollution levels)
-            'Delhi': 1.5, 'Gurugram': 1.45, 'Noida': 1.45, 'Chandigarh': 1.1,
-            'Lucknow': 1.3, 'Kanpur': 1.35, 'Varanasi': 1.25, 'Patna': 1.3,
-            'Jaipur': 1.2, 'Jodhpur': 1.15,
+logger = logging.getLogger(__name__)
+
+def season_factors(months) -> np.ndarray:
+    """Return the seasonal pollution factor (higher in winter months) per month"""
+    return np.where(np.isin(months, [11, 12, 1]), 1.3, 1.0)
 
-            # West India (moderate pollution levels)
-            'Mumbai': 1.2, 'Pune': 0.95, 'Ahmedabad': 1.1, 'Surat': 1.0,
-            'Nagpur': 0.9, 'Indore': 1.05, 'Bhopal': 1.0,
+def build_features(cities, temperatures, humidities, wind_speeds, months,
+                   columns=FEATURE_COLUMNS) -> pd.DataFrame:
+    """Return the model feature frame for a batch of city/condition rows.
 
-            # South India (generally lower pollution levels)
-            'Bangalore': 0.9, 'Chennai': 1.0, 'Hyderabad': 0.95, 'Kochi': 0.7,
-            'Thiruvananthapuram': 0.65, 'Mysuru': 0.75, 'Coimbatore': 0.8,
-            'Visakhapatnam': 0.85, 'Mangalore': 0.7,
+    ``columns`` picks and orders the features (any of SUPPORTED_FEATURES).
+    """
+    ids = CITY_REGISTRY.ids(cities)
+    builders = {
+        'temperature': lambda: np.asarray(temperatures, dtype=np.float64),
+        'humidity': lambda: np.asarray(humidities, dtype=np.float64),
+        'wind_speed': lambda: np.asarray(wind_speeds, dtype=np.float64),
+        'city_factor': lambda: CITY_REGISTRY.city_factors[ids],
+        'region_factor': lambda: CITY_REGISTRY.region_factors[ids],
+        'size_factor': lambda: CITY_REGISTRY.size_factors[ids],
+        'season_factor': lambda: season_factors(months),
+    }
+    return pd.DataFrame({column: builders[column]() for column in columns}, columns=list(columns))
+
+class AQIPredictor:
+    def __init__(self, writer=None, model_store=None):
+        # Served model; loaded lazily on the first prediction
+        self.model_store = model_store if model_store is not None else get_model_store()
+        # Optional PredictionWriter; when set, predictions are stored write-behind
+        self.writer = writer
+        self._skipped_versions = set()
 
-            # East India (varied pollution levels)
-            'Kolkata': 1.3, 'Bhubaneswar': 0.95, 'Guwahati': 0.9,
-            'Shillong': 0.7, 'Gangtok': 0.65, 'Imphal': 0.75
-        }
+    def serving_model(self):
+        """Return the active LoadedModel if build_features can produce its inputs, else None"""
+        loaded = self.model_store.get()
+        if loaded is None:
+            return None
+        if not loaded.features or not set(loaded.features) <= set(SUPPORTED_FEATURES):
+            if loaded.version not in self._skipped_versions:
+                self._skipped_versions.add(loaded.version)
+                logger.info("AQI model %s was not trained on features from %s; using the baseline formula",
+                            loaded.version, SUPPORTED_FEATURES)
+            return None
+        return loaded
 
-    def get_aqi_level(self, aqi):
+    @staticmethod
+    def get_aqi_level(aqi):
         """Return AQI level and color based on Indian AQI standards"""
         if aqi <= 50:
             return "Good", "#4CAF50"
@@ -43,58 +68,86 @@ class AQIPredictor:
         else:
             return "Severe", "#9C27B0"
 
-    def predict_aqi(self, city, temperature, humidity, wind_speed, db):
+    def predict_aqi(self, city, temperature, humidity, wind_speed, db=None):
         """Predict AQI based on Indian city characteristics"""
-        # Get city-specific factor
-        city_factor = self.city_factors.get(city, 1.0)
+        return float(self.predict_many([city], [temperature], [humidity], [wind_speed], db=db)[0])
 
-        # Get region and state-based factors
-        region, state = get_region_and_state(city)
-        region_factors = {
-            "North": 1.2,  # Higher pollution in North India
-            "South": 0.8,  # Lower pollution in South India
-            "East": 1.0,   # Moderate pollution in East India
-            "West": 1.1,   # Slightly higher pollution in West India
-            "Northeast": 0.7  # Lower pollution in Northeast India
-        }
-        region_factor = region_factors.get(region, 1.0)
+    def predict_many(self, cities, temperatures=None, humidities=None, wind_speeds=None, db=None,
+                     months=None, store=True):
+        """Predict AQI for many city/condition rows at once.
 
-        # Get city size factor
-        size_factor = get_city_size_factor(city)
+        ``cities`` is either a DataFrame with ``city``, ``temperature``,
+        ``humidity`` and ``wind_speed`` columns, or a sequence of city names
+        with the matching weather arrays passed separately. ``months`` sets
+        the season per row and defaults to the current month. Unless
+        ``store`` is False, all predictions are stored with one bulk insert
+        when ``db`` is given, or handed to the background writer when the
+        predictor has one.
+        """
+        if isinstance(cities, pd.DataFrame):
+            frame = cities
+            cities = frame['city'].to_numpy()
+            temperatures = frame['temperature'].to_numpy()
+            humidities = frame['humidity'].to_numpy()
+            wind_speeds = frame['wind_speed'].to_numpy()
 
-        # Calculate combined factor
-        if city not in self.city_factors:
-            city_factor = region_factor * size_factor
+        cities = np.asarray(cities, dtype=object)
+        temperatures = np.asarray(temperatures, dtype=np.float64)
+        humidities = np.asarray(humidities, dtype=np.float64)
+        wind_speeds = np.asarray(wind_speeds, dtype=np.float64)
+        if not (len(cities) == len(temperatures) == len(humidities) == len(wind_speeds)):
+            raise ValueError("cities and weather arrays must have the same length")
 
-        # Season factor (higher in winter months)
-        current_month = datetime.now().month
-        season_factor = 1.3 if current_month in [11, 12, 1] else 1.0
-
-        # Calculate base AQI
-        predicted_aqi = float(
-            temperature * 2.0 +  # Higher impact of temperature
-            humidity * 0.8 +     # Moderate impact of humidity
-            wind_speed * (-1.5) + # Strong negative impact of wind
-            np.random.normal(0, 5)  # Add some randomness
-        )
-
-        # Apply city and season factors
-        predicted_aqi = predicted_aqi * city_factor * season_factor
+        if months is None:
+            months = np.full(len(cities), datetime.now().month)
+        loaded = self.serving_model()
+        if loaded is not None:
+            features = build_features(cities, temperatures, humidities, wind_speeds, months,
+                                      columns=loaded.features)
+            if not hasattr(loaded.model, 'feature_names_in_'):
+                # Fitted on a bare array, e.g. the bundled model
+                features = features.to_numpy()
+            with metrics.span('predict.model'):
+                predicted_aqi = np.asarray(loaded.model.predict(features), dtype=np.float64)
+        else:
+            # Baseline formula
+            predicted_aqi = (
+                temperatures * 2.0 +  # Higher impact of temperature
+                humidities * 0.8 +    # Moderate impact of humidity
+                wind_speeds * (-1.5) + # Strong negative impact of wind
+                np.random.normal(0, 5, size=len(cities))  # Add some randomness
+            )
+            # Apply city and season factors
+            predicted_aqi = predicted_aqi * CITY_REGISTRY.city_factors[CITY_REGISTRY.ids(cities)] * season_factors(months)
 
         # Clip to valid AQI range for India (0-500)
-        predicted_aqi = float(max(0, min(500, predicted_aqi)))
+        predicted_aqi = np.clip(predicted_aqi, 0, 500)
+        metrics.increment('predictions', len(predicted_aqi))
 
-        # Store prediction
-        record = AirQualityRecord(
-            city=city,
-            date=datetime.utcnow(),
-            aqi=predicted_aqi,
-            temperature=float(temperature),
-            humidity=float(humidity),
-            wind_speed=float(wind_speed),
-            is_prediction=1
-        )
-        db.add(record)
-        db.commit()
+        # Store predictions
+        if store and (self.writer is not None or db is not None):
+            now = datetime.utcnow()
+            records = [
+                {
+                    'city': str(city),
+                    'date': now,
+                    'aqi': float(aqi),
+                    'temperature': float(temperature),
+                    'humidity': float(humidity),
+                    'wind_speed': float(wind_speed),
+                    'is_prediction': 1
+                }
+                for city, aqi, temperature, humidity, wind_speed
+                in zip(cities, predicted_aqi, temperatures, humidities, wind_speeds)
+            ]
+            if self.writer is not None:
+                with metrics.span('predict.enqueue'):
+                    accepted = self.writer.submit_many(records)
+                if accepted < len(records):
+                    metrics.increment('predictions_dropped', len(records) - accepted)
+                    logger.warning("Prediction writer queue full, dropped %d records",
+                                   len(records) - accepted)
+            else:
+                bulk_insert_records(db, records)
 
-        return predicted_aqi
\ No newline at end of file
+        return predicted_aqi
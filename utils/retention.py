@@ -0,0 +1,207 @@
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.orm import Session
+
+from . import metrics
+from .data_generator import history_cache
+from .database import AirQualityRecord, CompactionWatermark
+from .migrations import drop_partition, partitions_before
+from .rollups import update_rollups
+
+PREDICTION_TTL_DAYS = int(os.getenv('PREDICTION_TTL_DAYS', '30'))
+RAW_RETENTION_DAYS = int(os.getenv('RAW_RETENTION_DAYS', '365'))
+ARCHIVE_DIR = os.getenv('RETENTION_ARCHIVE_DIR', 'archive')
+DELETE_BATCH_SIZE = int(os.getenv('RETENTION_BATCH_SIZE', '5000'))
+
+ARCHIVE_COLUMNS = ['id', 'city', 'date', 'aqi', 'temperature', 'humidity', 'wind_speed', 'is_prediction']
+
+
+@dataclass
+class RetentionReport:
+    """What a retention run removed (or, for a dry run, would remove)"""
+    prediction_cutoff: datetime
+    raw_cutoff: datetime
+    dry_run: bool = False
+    predictions_deleted: int = 0
+    raw_deleted: int = 0
+    archived_rows: int = 0
+    partitions_dropped: List[str] = field(default_factory=list)
+    archive_files: List[str] = field(default_factory=list)
+
+
+def compaction_cutoff(now: datetime, retention_days: int) -> datetime:
+    """Return the start of the month containing ``now - retention_days``.
+
+    Raw readings before it are compacted. Monthly rollups and partitions
+    start on the same boundary, so no month is ever split.
+    """
+    moment = now - timedelta(days=retention_days)
+    return datetime(moment.year, moment.month, 1)
+
+
+def _archive_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ('id', pa.int64()), ('city', pa.string()), ('date', pa.timestamp('us')),
+        ('aqi', pa.float64()), ('temperature', pa.float64()), ('humidity', pa.float64()),
+        ('wind_speed', pa.float64()), ('is_prediction', pa.int8()),
+    ])
+
+
+def write_archive(chunks: Iterable[pd.DataFrame], path: str) -> int:
+    """Write record chunks to one zstd-compressed Parquet file.
+
+    The file is written and fsynced under a temporary name, then renamed,
+    so a complete archive is on disk before the caller deletes anything.
+    Nothing is written when there are no rows. Returns the row count.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Archiving needs pyarrow: pip install pyarrow (or disable archiving)") from None
+
+    schema = _archive_schema()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    writer = None
+    count = 0
+    try:
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            chunk = chunk.assign(date=pd.to_datetime(chunk['date']))
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, schema, compression='zstd')
+            writer.write_table(pa.Table.from_pandas(chunk[ARCHIVE_COLUMNS], schema=schema, preserve_index=False))
+            count += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    if count:
+        with open(tmp_path, 'rb') as handle:
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, path)
+    return count
+
+
+def archive_rows(db: Session, stmt, path: str, chunk_size: int = 50000) -> int:
+    """Stream the rows of ``stmt`` into a Parquet archive; returns the row count"""
+    stmt = stmt.execution_options(stream_results=True, max_row_buffer=chunk_size)
+    return write_archive(pd.read_sql(stmt, db.connection(), chunksize=chunk_size), path)
+
+
+def archive_and_delete(db: Session, condition, archive_dir: Optional[str],
+                       batch_size: int = DELETE_BATCH_SIZE) -> Tuple[int, List[str]]:
+    """Move matching records into Parquet parts, ``batch_size`` rows per transaction.
+
+    Each batch's ids are fixed when it is read: those rows are written to
+    ``archive_dir/part-NNNNN.parquet`` and then exactly those ids are
+    deleted and committed, so a row that starts matching mid-run is never
+    deleted unarchived. A crash between the two steps archives the batch
+    again on the next run. Short transactions keep lock times and the
+    dead-tuple backlog for autovacuum small. With ``archive_dir`` None
+    rows are only deleted. Returns the rows deleted and the files written.
+    """
+    table = AirQualityRecord.__table__
+    deleted = 0
+    files: List[str] = []
+    while True:
+        batch = pd.read_sql(
+            select(*(table.c[column] for column in ARCHIVE_COLUMNS))
+            .where(condition).order_by(table.c.id).limit(batch_size),
+            db.connection()
+        )
+        if batch.empty:
+            return deleted, files
+        if archive_dir is not None:
+            path = os.path.join(archive_dir, f"part-{len(files):05d}.parquet")
+            write_archive([batch], path)
+            files.append(path)
+        with metrics.span('retention.delete_batch'):
+            db.execute(delete(table).where(table.c.id.in_(batch['id'].tolist())))
+            db.commit()
+        deleted += len(batch)
+
+
+def _advance_watermark(db: Session, city: str, compacted_before: datetime) -> None:
+    watermark = db.get(CompactionWatermark, city)
+    if watermark is None:
+        db.add(CompactionWatermark(city=city, compacted_before=compacted_before))
+    elif watermark.compacted_before < compacted_before:
+        watermark.compacted_before = compacted_before
+
+
+def run_retention(db: Session, now: Optional[datetime] = None,
+                  prediction_ttl_days: int = PREDICTION_TTL_DAYS,
+                  raw_retention_days: int = RAW_RETENTION_DAYS,
+                  archive_dir: Optional[str] = ARCHIVE_DIR,
+                  batch_size: int = DELETE_BATCH_SIZE, dry_run: bool = False) -> RetentionReport:
+    """Expire old predictions and compact old raw readings into rollups.
+
+    Predictions older than ``prediction_ttl_days`` and raw readings before
+    the month-aligned compaction cutoff are archived to Parquet under
+    ``archive_dir`` (skipped when it is None) and then deleted. Rollups of
+    the compacted cities are refreshed first, and each city's compaction
+    watermark is advanced so later rebuilds keep them. On a partitioned
+    table, monthly partitions older than both cutoffs are locked, archived
+    whole and dropped in one transaction instead of deleted row by row.
+    """
+    now = now or datetime.utcnow()
+    report = RetentionReport(
+        prediction_cutoff=now - timedelta(days=prediction_ttl_days),
+        raw_cutoff=compaction_cutoff(now, raw_retention_days),
+        dry_run=dry_run,
+    )
+    table = AirQualityRecord.__table__
+    expired_predictions = (table.c.is_prediction == 1) & (table.c.date < report.prediction_cutoff)
+    expired_raw = (table.c.is_prediction == 0) & (table.c.date < report.raw_cutoff)
+    stamp = now.strftime('%Y%m%dT%H%M%S')
+    engine = db.get_bind()
+    expired_partitions = partitions_before(engine, min(report.prediction_cutoff, report.raw_cutoff).date())
+
+    if dry_run:
+        report.predictions_deleted = db.execute(select(func.count()).where(expired_predictions)).scalar()
+        report.raw_deleted = db.execute(select(func.count()).where(expired_raw)).scalar()
+        report.partitions_dropped = expired_partitions
+        return report
+
+    # Rollups must describe every reading before it is compacted away
+    compacted_cities = db.execute(select(table.c.city).where(expired_raw).distinct()).scalars().all()
+    for city in compacted_cities:
+        update_rollups(db, [city])
+        _advance_watermark(db, city, report.raw_cutoff)
+    db.commit()
+
+    for name in expired_partitions:
+        # SHARE mode blocks writes to the partition until it is dropped, so the archive is complete
+        db.execute(text(f"LOCK TABLE {name} IN SHARE MODE"))
+        if archive_dir is not None:
+            path = os.path.join(archive_dir, 'partitions', f"{name}.parquet")
+            stmt = text(f"SELECT {', '.join(ARCHIVE_COLUMNS)} FROM {name} ORDER BY id")
+            archived = archive_rows(db, stmt, path)
+            if archived:
+                report.archived_rows += archived
+                report.archive_files.append(path)
+        drop_partition(db.connection(), name)
+        db.commit()
+        report.partitions_dropped.append(name)
+
+    for kind, condition in (('predictions', expired_predictions), ('readings', expired_raw)):
+        directory = os.path.join(archive_dir, kind, stamp) if archive_dir is not None else None
+        deleted, files = archive_and_delete(db, condition, directory, batch_size)
+        report.archived_rows += deleted if directory is not None else 0
+        report.archive_files.extend(files)
+        if kind == 'predictions':
+            report.predictions_deleted = deleted
+        else:
+            report.raw_deleted = deleted
+
+    history_cache.invalidate()
+    return report
@@ -0,0 +1,175 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+from sqlalchemy import delete, insert, select, text, update
+from sqlalchemy.orm import Session
+
+from .database import AirQualityRecord, AQIRollup, CompactionWatermark
+
+# Resolution name -> pandas period alias used to bucket readings
+RESOLUTIONS: Dict[str, str] = {'day': 'D', 'week': 'W-SUN', 'month': 'M'}
+
+# First key of the PostgreSQL advisory locks taken per city while rebuilding
+ROLLUP_LOCK_NAMESPACE = 8008
+
+ROLLUP_COLUMNS = ['date', 'aqi', 'aqi_min', 'aqi_max', 'aqi_p95',
+                  'temperature', 'humidity', 'wind_speed', 'readings']
+
+
+def _period_floor(value: datetime, resolution: str) -> datetime:
+    """Return the start of the ``resolution`` period containing ``value``"""
+    day = datetime(value.year, value.month, value.day)
+    if resolution == 'week':
+        return day - timedelta(days=day.weekday())
+    if resolution == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _first_period_from(value: datetime, resolution: str) -> datetime:
+    """Return the start of the first ``resolution`` period beginning at or after ``value``"""
+    floor = _period_floor(value, resolution)
+    if floor == value:
+        return floor
+    if resolution == 'week':
+        return floor + timedelta(days=7)
+    if resolution == 'month':
+        return (floor + timedelta(days=32)).replace(day=1)
+    return floor + timedelta(days=1)
+
+
+def compaction_watermarks(db: Session, cities: Optional[Sequence[str]] = None) -> Dict[str, datetime]:
+    """Return each city's compaction watermark (only cities that have one)"""
+    table = CompactionWatermark.__table__
+    stmt = select(table.c.city, table.c.compacted_before)
+    if cities is not None:
+        stmt = stmt.where(table.c.city.in_(list(cities)))
+    return dict(db.execute(stmt).all())
+
+
+def compute_rollups(frame: pd.DataFrame, resolution: str) -> pd.DataFrame:
+    """Aggregate raw readings (city, date, aqi, weather) into one row per city and period"""
+    periods = frame['date'].dt.to_period(RESOLUTIONS[resolution]).dt.start_time
+    grouped = frame.groupby([frame['city'], periods.rename('period_start')])
+    aggregated = grouped.agg(
+        readings=('aqi', 'size'),
+        aqi_min=('aqi', 'min'),
+        aqi_mean=('aqi', 'mean'),
+        aqi_max=('aqi', 'max'),
+        temperature_mean=('temperature', 'mean'),
+        humidity_mean=('humidity', 'mean'),
+        wind_speed_mean=('wind_speed', 'mean'),
+    )
+    aggregated['aqi_p95'] = grouped['aqi'].quantile(0.95)
+    aggregated = aggregated.reset_index()
+    aggregated['resolution'] = resolution
+    return aggregated
+
+
+def _replace_rollups(db: Session, frame: pd.DataFrame, floors: Dict[str, datetime],
+                     city_list: Optional[List[str]]) -> int:
+    """Replace the rollups from each resolution's floor onwards with ones computed from ``frame``"""
+    written = 0
+    for resolution, floor in floors.items():
+        rollups = compute_rollups(frame[frame['date'] >= floor], resolution)
+        clear = (delete(AQIRollup)
+                 .where(AQIRollup.resolution == resolution)
+                 .where(AQIRollup.period_start >= floor))
+        if city_list is not None:
+            clear = clear.where(AQIRollup.city.in_(city_list))
+        db.execute(clear)
+        if not rollups.empty:
+            db.execute(insert(AQIRollup), rollups.to_dict('records'))
+            written += len(rollups)
+    return written
+
+
+def _lock_city(db: Session, city: str) -> None:
+    """Serialize rollup rebuilds of one city until the current transaction ends"""
+    dialect = db.get_bind().dialect.name
+    if dialect == 'postgresql':
+        db.execute(text("SELECT pg_advisory_xact_lock(:namespace, hashtext(:city))"),
+                   {'namespace': ROLLUP_LOCK_NAMESPACE, 'city': city})
+    elif dialect == 'sqlite':
+        # Any write takes SQLite's database-wide write lock for the rest of the transaction
+        db.execute(update(CompactionWatermark)
+                   .where(CompactionWatermark.city == city)
+                   .values(city=CompactionWatermark.city))
+
+
+def update_rollups(db: Session, cities: Optional[Sequence[str]] = None,
+                   since: Optional[datetime] = None) -> int:
+    """Recompute the rollup periods touched by readings newer than ``since``.
+
+    Only the given cities (all when None) and the periods from the one
+    containing ``since`` onwards are rebuilt, so appending new readings costs
+    a read of the current month rather than a full scan. Without ``since``
+    each city is rebuilt from its own oldest raw reading. Periods starting
+    before a city's compaction watermark (see retention) are never rebuilt,
+    because their raw readings were archived and deleted; that includes a
+    week straddling the watermark. Returns the rollup rows written.
+
+    Cities are read and rebuilt one at a time, each in its own transaction
+    holding a per-city lock, so memory is bounded by the largest city and
+    concurrent rebuilds of the same city run one after the other.
+    """
+    table = AirQualityRecord.__table__
+    earliest = (min(_period_floor(since, resolution) for resolution in RESOLUTIONS)
+                if since is not None else None)
+    if cities is None:
+        stmt = select(table.c.city).where(table.c.is_prediction == 0).distinct()
+        if earliest is not None:
+            stmt = stmt.where(table.c.date >= earliest)
+        cities = db.execute(stmt).scalars().all()
+
+    written = 0
+    for city in sorted(set(cities)):
+        _lock_city(db, city)
+        stmt = (select(table.c.city, table.c.date, table.c.aqi, table.c.temperature,
+                       table.c.humidity, table.c.wind_speed)
+                .where(table.c.is_prediction == 0)
+                .where(table.c.city == city))
+        if earliest is not None:
+            stmt = stmt.where(table.c.date >= earliest)
+        frame = pd.read_sql(stmt, db.connection())
+        frame['date'] = pd.to_datetime(frame['date'])
+        if frame.empty:
+            db.commit()
+            continue
+
+        watermark = compaction_watermarks(db, [city]).get(city)
+        start = since if since is not None else frame['date'].min().to_pydatetime()
+        floors = {}
+        for resolution in RESOLUTIONS:
+            floor = _period_floor(start, resolution)
+            if watermark is not None:
+                floor = max(floor, _first_period_from(watermark, resolution))
+            floors[resolution] = floor
+        written += _replace_rollups(db, frame, floors, [city])
+        db.commit()
+    return written
+
+
+def get_rollup_data(city: str, db: Session, resolution: str,
+                    start: Optional[datetime] = None, end: Optional[datetime] = None) -> pd.DataFrame:
+    """Return pre-aggregated history for a city at a 'day', 'week' or 'month' resolution"""
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution {resolution!r}; expected one of {list(RESOLUTIONS)}")
+    table = AQIRollup.__table__
+    stmt = (select(table.c.period_start.label('date'),
+                   table.c.aqi_mean.label('aqi'),
+                   table.c.aqi_min, table.c.aqi_max, table.c.aqi_p95,
+                   table.c.temperature_mean.label('temperature'),
+                   table.c.humidity_mean.label('humidity'),
+                   table.c.wind_speed_mean.label('wind_speed'),
+                   table.c.readings)
+            .where(table.c.city == city)
+            .where(table.c.resolution == resolution))
+    if start is not None:
+        stmt = stmt.where(table.c.period_start >= start)
+    if end is not None:
+        stmt = stmt.where(table.c.period_start < end)
+    frame = pd.read_sql(stmt.order_by(table.c.period_start), db.connection())
+    frame['date'] = pd.to_datetime(frame['date'])
+    return frame
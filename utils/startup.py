@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+PROFILE_FLAG = '--profile-startup'
+
+# Modules a Streamlit worker imports before it can serve the first page
+STARTUP_MODULES: Tuple[str, ...] = (
+    'streamlit',
+    'utils.assets',
+    'utils.cities_data',
+    'components.inputs',
+    'utils.database',
+    'utils.forecasts',
+    'utils.data_generator',
+    'utils.prediction_writer',
+    'utils.predictor',
+    'components.charts',
+)
+
+
+def profile_requested(argv: Optional[Sequence[str]] = None) -> bool:
+    """Return True if the startup profile was asked for on the command line"""
+    return PROFILE_FLAG in (sys.argv if argv is None else argv)
+
+
+@lru_cache(maxsize=None)
+def import_profile(modules: Tuple[str, ...] = STARTUP_MODULES) -> List[Tuple[str, float]]:
+    """Return (top-level package, seconds) for a cold import of ``modules``, slowest first.
+
+    The imports run in a fresh interpreter under ``-X importtime``, so the
+    numbers match what a newly started worker pays regardless of what this
+    process has already loaded.
+    """
+    code = '; '.join(f"import {module}" for module in modules)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.getenv('PYTHONPATH')])))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, env=env, check=True
+    )
+
+    totals = defaultdict(int)
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        totals[name.strip().split('.')[0]] += int(self_us)
+    return sorted(((name, us / 1e6) for name, us in totals.items()), key=lambda row: -row[1])
+
+
+def format_profile(rows: List[Tuple[str, float]], limit: int = 15) -> str:
+    """Return the import profile as a plain-text table"""
+    total = sum(seconds for _, seconds in rows)
+    lines = [f"{'package':<24}{'seconds':>10}{'share':>8}"]
+    for name, seconds in rows[:limit]:
+        lines.append(f"{name:<24}{seconds:>10.3f}{seconds / total:>8.1%}")
+    rest = sum(seconds for _, seconds in rows[limit:])
+    if rest:
+        lines.append(f"{'(other)':<24}{rest:>10.3f}{rest / total:>8.1%}")
+    lines.append(f"{'total':<24}{total:>10.3f}")
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    print(format_profile(import_profile()))
@@ -0,0 +1,189 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from .cities_data import CITY_REGISTRY, city_seed, get_all_cities
+
+# Months with higher pollution (matches generate_historical_frame)
+WINTER_MONTHS = (11, 12, 1)
+
+
+@dataclass(frozen=True)
+class MonthTask:
+    """One month of hourly readings for a batch of cities"""
+    month_start: datetime
+    cities: Tuple[str, ...]
+    # City whose registry factors each entry uses (differs for replicas)
+    base_cities: Tuple[str, ...]
+    root_seed: int
+    part: int
+
+
+def city_month_rng(city: str, month_start: datetime, root_seed: int = 0) -> np.random.Generator:
+    """Return the random stream for one city and month.
+
+    Streams are keyed by ``(root_seed, city_seed(city), month)``, so a
+    city-month always gets the same readings however the work is split
+    between processes, and on any machine.
+    """
+    month_index = month_start.year * 12 + month_start.month - 1
+    return np.random.default_rng(np.random.SeedSequence([root_seed, city_seed(city), month_index]))
+
+
+def month_starts(start: datetime, end: datetime) -> List[datetime]:
+    """Return the first instant of every month overlapping ``[start, end)``"""
+    return [month.to_pydatetime() for month in
+            pd.date_range(pd.Timestamp(start).to_period('M').start_time, end, freq='MS', inclusive='left')]
+
+
+def generate_month(cities: Sequence[str], month_start: datetime, root_seed: int = 0,
+                   base_cities: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Generate hourly readings for ``cities`` over the month starting at ``month_start``"""
+    hours = pd.date_range(month_start, pd.Timestamp(month_start) + pd.offsets.MonthBegin(1),
+                          freq='h', inclusive='left')
+    hour_of_day = hours.hour.to_numpy()
+    count = len(hours)
+
+    base_aqi = CITY_REGISTRY.base_aqi[CITY_REGISTRY.ids(base_cities if base_cities is not None else cities)]
+    season = 1.2 if month_start.month in WINTER_MONTHS else 0.8
+    # Traffic peaks in the morning; afternoons are warmest
+    aqi_cycle = 1 + 0.15 * np.cos(2 * np.pi * (hour_of_day - 8) / 24)
+    temperature_cycle = 4 * np.cos(2 * np.pi * (hour_of_day - 15) / 24)
+    seasonal_temperature = 27 + 6 * np.cos(2 * np.pi * (month_start.month - 5) / 12)
+
+    shape = (len(cities), count)
+    aqi = np.empty(shape)
+    temperature = np.empty(shape)
+    humidity = np.empty(shape)
+    wind_speed = np.empty(shape)
+    for row, (city, base) in enumerate(zip(cities, base_aqi)):
+        rng = city_month_rng(city, month_start, root_seed)
+        aqi[row] = base * season * aqi_cycle + rng.normal(0, 20, count)
+        temperature[row] = seasonal_temperature + temperature_cycle + rng.normal(0, 2, count)
+        humidity[row] = rng.normal(65, 15, count)
+        wind_speed[row] = rng.normal(12, 4, count)
+
+    return pd.DataFrame({
+        'city': pd.Categorical(np.repeat(np.asarray(cities, dtype=object), count)),
+        'date': np.tile(hours.to_numpy(), len(cities)),
+        'aqi': np.clip(aqi, 0, 500).ravel(),
+        'temperature': temperature.ravel(),
+        'humidity': np.clip(humidity, 5, 100).ravel(),
+        'wind_speed': np.clip(wind_speed, 0, None).ravel(),
+        'is_prediction': 0,
+    })
+
+
+def plan_tasks(start: datetime, end: datetime, cities: Optional[Sequence[str]] = None,
+               root_seed: int = 0, replicas: int = 1, cities_per_task: int = 50) -> List[MonthTask]:
+    """Split a dataset into month-by-city-batch tasks.
+
+    ``replicas`` > 1 adds ``"<city> #2"`` ... copies of every city, each
+    with its own stream but the original city's factors, to reach
+    load-test volumes.
+    """
+    if cities is None:
+        cities = get_all_cities()
+    cities = sorted(set(cities))
+    names = [city if copy == 1 else f"{city} #{copy}" for copy in range(1, replicas + 1) for city in cities]
+    bases = [city for _ in range(replicas) for city in cities]
+
+    tasks = []
+    for month_start in month_starts(start, end):
+        for part, first in enumerate(range(0, len(names), cities_per_task)):
+            tasks.append(MonthTask(month_start, tuple(names[first:first + cities_per_task]),
+                                   tuple(bases[first:first + cities_per_task]), root_seed, part))
+    return tasks
+
+
+def task_cities(tasks: Iterable[MonthTask]) -> List[str]:
+    """Return every city name covered by the tasks"""
+    return sorted({city for task in tasks for city in task.cities})
+
+
+def _task_frame(task: MonthTask, start: datetime, end: datetime) -> pd.DataFrame:
+    frame = generate_month(task.cities, task.month_start, task.root_seed, task.base_cities)
+    # Trim the first and last months to the requested range
+    return frame[(frame['date'] >= start) & (frame['date'] < end)]
+
+
+def _write_parquet_task(task: MonthTask, start: datetime, end: datetime, output_dir: str) -> int:
+    frame = _task_frame(task, start, end)
+    directory = os.path.join(output_dir, f"month={task.month_start:%Y-%m}")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"part-{task.part:05d}.parquet")
+    frame.to_parquet(f"{path}.tmp", index=False, compression='zstd')
+    os.replace(f"{path}.tmp", path)
+    return len(frame)
+
+
+def _run_ordered(function: Callable, tasks: Sequence[MonthTask], args: Tuple,
+                 workers: Optional[int]) -> Iterator:
+    """Yield ``function(task, *args)`` for every task, in order.
+
+    With more than one worker the tasks fan out over a process pool, with
+    at most two tasks per worker in flight so results never pile up.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for task in tasks:
+            yield function(task, *args)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        remaining = iter(tasks)
+        while True:
+            while len(pending) < workers * 2:
+                task = next(remaining, None)
+                if task is None:
+                    break
+                pending.append(executor.submit(function, task, *args))
+            if not pending:
+                return
+            yield pending.popleft().result()
+
+
+def write_parquet_dataset(output_dir: str, tasks: Sequence[MonthTask], start: datetime, end: datetime,
+                          workers: Optional[int] = None,
+                          progress: Optional[Callable[[int, int], None]] = None) -> int:
+    """Write a month-partitioned Parquet dataset (``month=YYYY-MM/part-NNNNN.parquet``).
+
+    Workers write their own files. Returns the number of rows written.
+    """
+    written = 0
+    for done, rows in enumerate(_run_ordered(_write_parquet_task, tasks, (start, end, output_dir), workers), 1):
+        written += rows
+        if progress is not None:
+            progress(done, written)
+    return written
+
+
+def load_dataset(db: Session, tasks: Sequence[MonthTask], start: datetime, end: datetime,
+                 workers: Optional[int] = None, refresh_rollups: bool = True,
+                 progress: Optional[Callable[[int, int], None]] = None) -> int:
+    """Generate the tasks in worker processes and bulk load them into the database.
+
+    Rows are loaded in task order with one COPY (or executemany) per task,
+    so repeated runs load identical tables. Returns the number of rows loaded.
+    """
+    from .data_generator import notify_history_written
+    from .database import copy_records
+
+    loaded = 0
+    for done, frame in enumerate(_run_ordered(_task_frame, tasks, (start, end), workers), 1):
+        frame = frame.astype({'city': object})
+        loaded += copy_records(db, frame)
+        if progress is not None:
+            progress(done, loaded)
+    if refresh_rollups:
+        # City by city, so each refresh only holds one city's readings in memory
+        for city in task_cities(tasks):
+            notify_history_written(db, [city])
+    return loaded
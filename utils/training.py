@@ -0,0 +1,105 @@
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Iterator, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .database import AirQualityRecord
+from .model_store import ModelStore, get_model_store, write_atomic
+from .predictor import build_features
+
+logger = logging.getLogger(__name__)
+
+TRAINING_STATE_FILE = 'training_state.joblib'
+
+
+@dataclass
+class TrainingState:
+    """Incrementally fitted estimators plus the last record id they have seen"""
+    scaler: Any = field(default_factory=StandardScaler)
+    regressor: Any = field(default_factory=lambda: SGDRegressor(random_state=0))
+    high_water_mark: int = 0
+    rows_seen: int = 0
+    # high_water_mark of the last published version
+    published_mark: int = 0
+
+    def to_pipeline(self) -> Pipeline:
+        """Return a servable pipeline made of the already fitted steps"""
+        return Pipeline([('scale', self.scaler), ('model', self.regressor)])
+
+
+def load_training_state(store: ModelStore) -> TrainingState:
+    """Load the saved training state, or start from scratch"""
+    path = os.path.join(store.model_dir, TRAINING_STATE_FILE)
+    if not os.path.exists(path):
+        return TrainingState()
+    return joblib.load(path)
+
+
+def save_training_state(store: ModelStore, state: TrainingState) -> None:
+    """Persist the training state atomically"""
+    os.makedirs(store.model_dir, exist_ok=True)
+    path = os.path.join(store.model_dir, TRAINING_STATE_FILE)
+    write_atomic(path, lambda handle: joblib.dump(state, handle))
+
+
+def iter_training_chunks(db: Session, after_id: int = 0, chunk_size: int = 50000) -> Iterator[pd.DataFrame]:
+    """Stream historical rows with ``id > after_id`` in id order through a server-side cursor"""
+    table = AirQualityRecord.__table__
+    stmt = (select(table.c.id, table.c.city, table.c.date, table.c.aqi,
+                   table.c.temperature, table.c.humidity, table.c.wind_speed)
+            .where(table.c.is_prediction == 0)
+            .where(table.c.id > after_id)
+            .order_by(table.c.id)
+            .execution_options(stream_results=True, max_row_buffer=chunk_size))
+    result = db.connection().execute(stmt)
+    for rows in result.partitions(chunk_size):
+        yield pd.DataFrame(rows, columns=list(result.keys()))
+
+
+def train_incremental(db: Session, store: Optional[ModelStore] = None, chunk_size: int = 50000,
+                      full: bool = False, activate: bool = True) -> Optional[str]:
+    """Fit the model on rows added since the last run and publish a new version.
+
+    Each chunk updates a StandardScaler and an SGDRegressor with
+    ``partial_fit``, so memory stays bounded by ``chunk_size``. The high-water
+    mark is saved after every chunk; an interrupted run resumes from there,
+    and a state trained past the last published version is published even
+    when no new rows arrived since. Returns the published version, or None
+    when there was nothing new to publish.
+    """
+    store = store if store is not None else get_model_store()
+    state = TrainingState() if full else load_training_state(store)
+
+    for chunk in iter_training_chunks(db, after_id=state.high_water_mark, chunk_size=chunk_size):
+        last_id = int(chunk['id'].max())
+        chunk = chunk.dropna(subset=['aqi', 'temperature', 'humidity', 'wind_speed', 'date'])
+        if not chunk.empty:
+            months = pd.to_datetime(chunk['date']).dt.month.to_numpy()
+            features = build_features(chunk['city'].to_numpy(), chunk['temperature'],
+                                      chunk['humidity'], chunk['wind_speed'], months)
+            target = chunk['aqi'].to_numpy(dtype=np.float64)
+            state.scaler.partial_fit(features)
+            state.regressor.partial_fit(state.scaler.transform(features), target)
+            state.rows_seen += len(chunk)
+        state.high_water_mark = last_id
+        save_training_state(store, state)
+        logger.info("Trained through id %d (%d rows total)", state.high_water_mark, state.rows_seen)
+
+    if state.high_water_mark <= state.published_mark or state.rows_seen == 0:
+        return None
+
+    version = f"sgd-{datetime.utcnow():%Y%m%dT%H%M%S}-id{state.high_water_mark}"
+    store.publish(state.to_pipeline(), version, activate=activate)
+    state.published_mark = state.high_water_mark
+    save_training_state(store, state)
+    return version